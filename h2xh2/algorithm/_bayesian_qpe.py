@@ -18,11 +18,16 @@ Grid-based bayesian QPE, not based on the more efficient Fourier respresentation
 for the sake of simplicity.
 """
 
-from typing import Callable
-from pytket.backends.backendresult import BackendResult
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable, Counter
 import numpy as np
 from ._utils import noise_aware_likelihood
 
+if TYPE_CHECKING:
+    # Only used in annotations, and importing it pulls in scipy.
+    from pytket.backends.backendresult import BackendResult
+
 PRECISION = 15
 ATOL = 10**-PRECISION
 
@@ -92,24 +97,30 @@ def bootstrap_sampling(
     ms: list[int],
     error_rate: Callable[[int], float] | None = None,
     b: int = 1000,
+    rng: np.random.Generator | None = None,
 ) -> tuple[float, float]:
-    """Bootstrap resampling method."""
+    """Bootstrap resampling method.
+
+    The resamples are drawn from ``rng`` if given, otherwise from the global
+    NumPy random state.
+    """
+    if rng is None:
+        rng = np.random
     phi_tilde: list[float] = []
-    ilist = list(range(len(ks)))
-    prior = np.ones_like(phi)
+    # Resampling the shots with replacement only changes how often each distinct
+    # (k, beta, m) is drawn, so draw those counts in one go and weight the
+    # per-shot log-likelihoods instead of redoing the update shot by shot.
+    shots = Counter(zip(ks, betas, ms))
+    log_likelihoods = np.array(
+        [
+            update_log(phi, np.ones_like(phi), [k], [beta], [m], error_rate=error_rate)
+            for k, beta, m in shots
+        ]
+    )
+    p = np.array(list(shots.values())) / len(ks)
     for ib in range(b):
-        indices = np.random.choice(ilist, size=len(ilist))
-        ks_b = [ks[i] for i in indices]
-        betas_b = [betas[i] for i in indices]
-        ms_b = [ms[i] for i in indices]
-        posterior = update(
-            phi,
-            prior,
-            ks_b,
-            betas_b,
-            ms_b,
-            error_rate=error_rate,
-        )
+        counts = rng.multinomial(len(ks), p)
+        posterior = _normalize(phi, counts @ log_likelihoods)
         ii = np.argmax(posterior)
         phi_tilde.append(phi[ii])
     phi_tilde = np.array(phi_tilde)
@@ -142,9 +153,9 @@ def update_log(
         Posterior distribution (normalized).
     """
     log_prior = np.log(prior)
-    for k, beta, m in zip(ks, betas, ms):
-        if m is None:
-            continue
+    # Repeated shots share the likelihood, so evaluate it once per distinct (k, beta, m).
+    shots = Counter((k, beta, m) for k, beta, m in zip(ks, betas, ms) if m is not None)
+    for (k, beta, m), count in shots.items():
         likelihood = noise_aware_likelihood(
             k=k,
             beta=beta,
@@ -152,7 +163,7 @@ def update_log(
             phi=phi,
             error_rate=error_rate,
         )
-        log_prior += np.log(
+        log_prior += count * np.log(
             np.maximum(likelihood, ATOL),
         )
     return log_prior
@@ -180,7 +191,15 @@ def update(
         Posterior distribution (normalized).
     """
     log_prior = update_log(phi, prior, ks, betas, ms, error_rate)
-    log_prior -= np.max(log_prior)
+    return _normalize(phi, log_prior)
+
+
+def _normalize(
+    phi: np.ndarray[float],
+    log_prior: np.ndarray[float],
+) -> np.ndarray[float]:
+    """Normalized distribution from the (unnormalized) log distribution."""
+    log_prior = log_prior - np.max(log_prior)
     posterior = np.exp(log_prior)
     # Normalize the posterior distribution.
     dphi = phi[1] - phi[0]
@@ -194,7 +213,10 @@ def generate_ks(
     n_samples: int,
     error_rate: Callable[[int], float] | None = None,
     discard_rate: Callable[[int], float] | None = None,
+    rng: np.random.Generator | None = None,
 ) -> list[int]:
+    if rng is None:
+        rng = np.random
     ks = list(range(1, k_max + 1))
     if error_rate is None:
         dist = np.ones(len(ks), dtype=float)
@@ -205,6 +227,6 @@ def generate_ks(
     else:
         dist *= np.array([1 / (1 - discard_rate(k)) for k in ks])
     dist /= np.sum(dist)
-    k_list = np.random.choice(ks, size=n_samples, replace=True, p=dist)
+    k_list = rng.choice(ks, size=n_samples, replace=True, p=dist)
     k_list = [int(k) for k in k_list]
     return k_list
@@ -49,13 +49,17 @@ def get_mu_and_sigma(
         If the distribution is not localized, the results may not be accurate.
     """
     dphi = 2 / len(phi)
-    mu = np.sum(np.array(prior) * phi) * dphi
-    sigma = np.sqrt(np.sum(prior * (phi - mu) ** 2) * dphi)
+    prior = np.asarray(prior)
+    mu = (prior @ phi) * dphi
+    dev = phi - mu
+    var = (prior @ dev**2) * dphi
+    # Same moments with the first half of the grid shifted by 2, obtained from the
+    # ones above rather than from a shifted copy of the grid.
     l = len(phi) // 2
-    phi1 = np.copy(phi)
-    phi1[:l] += 2.0
-    mu1 = np.sum(prior * phi1) * dphi
-    sigma1 = np.sqrt(np.sum(prior * (phi1 - mu) ** 2) * dphi)
+    mu1 = mu + 2.0 * np.sum(prior[:l]) * dphi
+    var1 = var + 4.0 * (prior[:l] @ (dev[:l] + 1.0)) * dphi
+    sigma = np.sqrt(var)
+    sigma1 = np.sqrt(var1)
     if sigma1 < sigma:
         mu = mu1
         sigma = sigma1
@@ -77,19 +81,22 @@ def binary_fraction(readout: list[int]) -> float:
         >>> binary_fraction([0, 0, 1])
         0.25
     """
-    phase = 0.0
-    for i, r in enumerate(readout):
-        phase += r * (0.5**i)
-    return phase
+    if not readout:
+        return 0.0
+    # Read the bits as an integer, then scale so the first bit weighs 1.
+    value = 0
+    for r in readout:
+        value = (value << 1) | int(r)
+    return value / (1 << (len(readout) - 1))
 
 
 def noise_aware_likelihood(
     k: int,
     beta: float,
     m: int,
-    phi: Union[float, list],
+    phi: Union[float, list, np.ndarray],
     error_rate: Optional[Callable[[int], float]] = None,
-) -> Union[float, list]:
+) -> Union[float, np.ndarray]:
     """Likelihood function for the noiseless simulation.
 
     Args:
@@ -110,8 +117,12 @@ def noise_aware_likelihood(
     q = 0.0
     if error_rate is not None:
         q = error_rate(k)
-    phi = np.array(phi)
-    val = 1 + (1 - q) * (-1) ** m * np.cos(np.pi * (k * phi + beta))
-    val *= 0.5
-    val = val.tolist()
-    return val
+    # Fold the scalar factors together and update a single buffer in place.
+    val = np.array(phi, dtype=float)
+    val *= k * np.pi
+    val += beta * np.pi
+    np.cos(val, out=val)
+    val *= 0.5 * (1 - q) * (-1) ** m
+    val += 0.5
+    # A scalar phase gives a float, a grid of phases an array.
+    return val if val.ndim else float(val)
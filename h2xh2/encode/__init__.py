@@ -35,6 +35,7 @@ from .rz_encoding import (
 
 from .state_prep import (
     get_non_ft_prep,
+    get_non_ft_plus_prep,
     get_ft_prep,
 )
 
@@ -57,6 +58,8 @@ from .steane_corrections import (
     steane_lookup_table,
     syndrome_from_readout,
     readout_correction,
+    readout_correction_batch,
+    syndromes_from_readouts,
 )
 
 from .iceberg_detections import (
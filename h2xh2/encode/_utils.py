@@ -0,0 +1,116 @@
+# Copyright 2025 Quantinuum (www.quantinuum.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Circuit construction helpers shared by the encoding modules."""
+
+from pytket.circuit import (
+    Bit,
+    Circuit,
+    ClBitVar,
+    ClExpr,
+    ClOp,
+    OpType,
+    Qubit,
+    WiredClExpr,
+)
+from typing import Dict, List, Sequence, Tuple
+from functools import lru_cache, reduce
+
+
+# Two-input bit expressions writing to a third bit, args (in0, in1, out). They are
+# immutable, so one instance is shared by every add_clexpr call.
+BIT_OR: WiredClExpr = WiredClExpr(
+    expr=ClExpr(op=ClOp.BitOr, args=[ClBitVar(0), ClBitVar(1)]),
+    bit_posn={0: 0, 1: 1},
+    output_posn=[2],
+)
+BIT_XOR: WiredClExpr = WiredClExpr(
+    expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(0), ClBitVar(1)]),
+    bit_posn={0: 0, 1: 1},
+    output_posn=[2],
+)
+
+
+# Data qubit indices of the three Steane stabilizer generators, the same for the
+# X and Z type: XXXXIII / IXXIXXI / IIXXIXX.
+STABILIZER_SUPPORTS: Tuple[Tuple[int, int, int, int], ...] = (
+    (0, 1, 2, 3),
+    (1, 2, 4, 5),
+    (2, 3, 5, 6),
+)
+
+
+@lru_cache(maxsize=None)
+def bit_or_all(n_inputs: int) -> WiredClExpr:
+    """OR of n_inputs bits written to another bit, args (in0, ..., out).
+
+    One expression replaces a chain of BIT_OR through scratch bits.
+    """
+    assert n_inputs >= 2
+    return WiredClExpr(
+        expr=reduce(
+            lambda acc, i: ClExpr(op=ClOp.BitOr, args=[acc, ClBitVar(i)]),
+            range(2, n_inputs),
+            ClExpr(op=ClOp.BitOr, args=[ClBitVar(0), ClBitVar(1)]),
+        ),
+        bit_posn={i: i for i in range(n_inputs)},
+        output_posn=[n_inputs],
+    )
+
+
+def _group_by_register(units: Sequence[Qubit | Bit]) -> Dict[str, List[Qubit | Bit]]:
+    groups: Dict[str, List[Qubit | Bit]] = {}
+    for u in units:
+        groups.setdefault(u.reg_name, []).append(u)
+    return groups
+
+
+def _is_whole_register(units: List[Qubit | Bit]) -> bool:
+    return [u.index for u in units] == [[i] for i in range(len(units))]
+
+
+def add_qubits(c: Circuit, qubits: Sequence[Qubit]) -> None:
+    """Add qubits to the circuit, one register at a time where possible.
+
+    A register is added in one call if the qubits given for it are exactly
+    name[0], ..., name[n-1] and the circuit has no register of that name yet.
+    """
+    existing: set[str] = {r.name for r in c.q_registers}
+    for name, units in _group_by_register(qubits).items():
+        if name not in existing and _is_whole_register(units):
+            c.add_q_register(name, len(units))
+        else:
+            for q in units:
+                c.add_qubit(q)
+
+
+def add_bits(c: Circuit, bits: Sequence[Bit]) -> None:
+    """Add bits to the circuit, one register at a time where possible.
+
+    See `add_qubits`.
+    """
+    existing: set[str] = {r.name for r in c.c_registers}
+    for name, units in _group_by_register(bits).items():
+        if name not in existing and _is_whole_register(units):
+            c.add_c_register(name, len(units))
+        else:
+            for b in units:
+                c.add_bit(b)
+
+
+def add_resets(c: Circuit, qubits: Sequence[Qubit]) -> None:
+    """Reset each of the (already added) qubits."""
+    add_gate = c.add_gate
+    for q in qubits:
+        add_gate(OpType.Reset, [q])
@@ -12,118 +12,113 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from pytket.circuit import Bit, Circuit, Qubit, Pauli
-from typing import List
+from pytket.circuit import Bit, Circuit, OpType, Qubit, Pauli
+from typing import Dict, List, Tuple
 from itertools import pairwise
+from operator import itemgetter
+from ._utils import add_qubits, add_bits
 
 
 # https://journals.aps.org/prx/abstract/10.1103/PhysRevX.11.041058
 
 
-def get_H(data_qubits: List[Qubit]) -> Circuit:
+# logical single qubit gate -> physical gate and the data qubit indices it acts on
+_TRANSVERSAL_GATES: Dict[OpType, Tuple[OpType, Tuple[int, ...]]] = {
+    OpType.H: (OpType.H, tuple(range(7))),
+    OpType.X: (OpType.X, (1, 3, 5)),
+    OpType.Y: (OpType.Y, (1, 3, 5)),
+    OpType.Z: (OpType.Z, (1, 3, 5)),
+    OpType.S: (OpType.Sdg, tuple(range(7))),
+    OpType.Sdg: (OpType.S, tuple(range(7))),
+    OpType.V: (OpType.Vdg, tuple(range(7))),
+    OpType.Vdg: (OpType.V, tuple(range(7))),
+}
+
+
+# adds the gates straight onto c, whose qubits must include data_qubits
+def _add_transversal(c: Circuit, op_type: OpType, data_qubits: List[Qubit]) -> None:
     assert len(data_qubits) == 7
-    c: Circuit = Circuit()
-    for q in data_qubits:
-        c.add_qubit(q)
-        c.H(q)
+    physical, indices = _TRANSVERSAL_GATES[op_type]
+    for i in indices:
+        c.add_gate(physical, [data_qubits[i]])
 
+
+def _get_transversal(op_type: OpType, data_qubits: List[Qubit]) -> Circuit:
+    c: Circuit = Circuit()
+    add_qubits(c, [data_qubits[i] for i in _TRANSVERSAL_GATES[op_type][1]])
+    _add_transversal(c, op_type, data_qubits)
     return c
 
 
-def get_X(data_qubits: List[Qubit]) -> Circuit:
-    assert len(data_qubits) == 7
-    c: Circuit = Circuit()
-    for q in [data_qubits[1], data_qubits[3], data_qubits[5]]:
-        c.add_qubit(q)
-        c.X(q)
+def get_H(data_qubits: List[Qubit]) -> Circuit:
+    return _get_transversal(OpType.H, data_qubits)
 
-    return c
 
+def get_X(data_qubits: List[Qubit]) -> Circuit:
+    return _get_transversal(OpType.X, data_qubits)
 
-def get_Y(data_qubits: List[Qubit]) -> Circuit:
-    assert len(data_qubits) == 7
-    c: Circuit = Circuit()
-    for q in [data_qubits[1], data_qubits[3], data_qubits[5]]:
-        c.add_qubit(q)
-        c.Y(q)
 
-    return c
+def get_Y(data_qubits: List[Qubit]) -> Circuit:
+    return _get_transversal(OpType.Y, data_qubits)
 
 
 def get_Z(data_qubits: List[Qubit]) -> Circuit:
-    assert len(data_qubits) == 7
-    c: Circuit = Circuit()
-    for q in [data_qubits[1], data_qubits[3], data_qubits[5]]:
-        c.add_qubit(q)
-        c.Z(q)
-
-    return c
+    return _get_transversal(OpType.Z, data_qubits)
 
 
 def get_S(data_qubits: List[Qubit]) -> Circuit:
-    assert len(data_qubits) == 7
-    c: Circuit = Circuit()
-    for q in data_qubits:
-        c.add_qubit(q)
-        c.Sdg(q)
-
-    return c
+    return _get_transversal(OpType.S, data_qubits)
 
 
 def get_Sdg(data_qubits: List[Qubit]) -> Circuit:
-    assert len(data_qubits) == 7
-    c: Circuit = Circuit()
-    for q in data_qubits:
-        c.add_qubit(q)
-        c.S(q)
-
-    return c
+    return _get_transversal(OpType.Sdg, data_qubits)
 
 
 def get_V(data_qubits: List[Qubit]) -> Circuit:
-    assert len(data_qubits) == 7
-    c: Circuit = Circuit()
-    for q in data_qubits:
-        c.add_qubit(q)
-        c.Vdg(q)
-
-    return c
+    return _get_transversal(OpType.V, data_qubits)
 
 
 def get_Vdg(data_qubits: List[Qubit]) -> Circuit:
-    assert len(data_qubits) == 7
-    c: Circuit = Circuit()
-    for q in data_qubits:
-        c.add_qubit(q)
-        c.V(q)
-
-    return c
+    return _get_transversal(OpType.Vdg, data_qubits)
 
 
-def get_CX(control_qubits: List[Qubit], target_qubits: List[Qubit]) -> Circuit:
-    c: Circuit = Circuit()
+# adds the transversal CX straight onto c, whose qubits must include both blocks
+def _add_CX(
+    c: Circuit, control_qubits: List[Qubit], target_qubits: List[Qubit]
+) -> None:
     assert len(control_qubits) == 7
     assert len(target_qubits) == 7
     for control, target in zip(control_qubits, target_qubits):
-        c.add_qubit(control)
-        c.add_qubit(target)
         c.CX(control, target)
 
-    return c
-
 
-def get_Measure(qubits: List[Qubit], bits: List[Bit]) -> Circuit:
+# adds the measurements straight onto c, whose qubits and bits must include these
+def _add_Measure(c: Circuit, qubits: List[Qubit], bits: List[Bit]) -> None:
     assert len(qubits) == 7
     assert len(bits) == 7
-    c: Circuit = Circuit()
     for q, b in zip(qubits, bits):
-        c.add_qubit(q)
-        c.add_bit(b)
         c.Measure(q, b)
 
+
+def get_CX(control_qubits: List[Qubit], target_qubits: List[Qubit]) -> Circuit:
+    c: Circuit = Circuit()
+    add_qubits(c, [*control_qubits, *target_qubits])
+    _add_CX(c, control_qubits, target_qubits)
+    return c
+
+
+def get_Measure(qubits: List[Qubit], bits: List[Bit]) -> Circuit:
+    c: Circuit = Circuit()
+    add_qubits(c, qubits)
+    add_bits(c, bits)
+    _add_Measure(c, qubits, bits)
     return c
 
 
+# the data qubits a logical Pauli acts on, X, Y and Z alike
+_LOGICAL_SUPPORT: itemgetter = itemgetter(1, 3, 5)
+
+
 def get_Pauli_exponential(
     all_data_qubits: List[List[Qubit]], pauli_letters: List[Pauli], phase: float
 ):
@@ -136,26 +131,30 @@ def get_Pauli_exponential(
         if pauli == Pauli.Y:
             phase_corrected *= -1
         paulis_collected += [pauli] * 3
-        qubits_collected += [data_qubits[1], data_qubits[3], data_qubits[5]]
+        qubits_collected += _LOGICAL_SUPPORT(data_qubits)
 
     assert len(qubits_collected) > 1
 
-    basis_change: Circuit = Circuit()
+    # basis change (gate, inverse, qubit), undone in reverse after the ZZPhase
+    basis_change: List[Tuple[OpType, OpType, Qubit]] = []
     c: Circuit = Circuit()
+    add_qubits(c, qubits_collected)
     for q, p in zip(qubits_collected, paulis_collected):
         assert p != Pauli.I
-        c.add_qubit(q)
-        basis_change.add_qubit(q)
         if p == Pauli.X:
-            basis_change.H(q)
+            basis_change.append((OpType.H, OpType.H, q))
         if p == Pauli.Y:
-            basis_change.V(q)
+            basis_change.append((OpType.V, OpType.Vdg, q))
+    cx_pairs: List[Tuple[Qubit, Qubit]] = list(pairwise(qubits_collected[:-1]))
 
-    for q_pair in pairwise(qubits_collected[:-1]):
-        basis_change.CX(q_pair[0], q_pair[1])
-
-    c.append(basis_change)
+    for gate, _, q in basis_change:
+        c.add_gate(gate, [q])
+    for control, target in cx_pairs:
+        c.CX(control, target)
     c.ZZPhase(phase_corrected, qubits_collected[-1], qubits_collected[-2])
-    c.append(basis_change.dagger())
+    for control, target in reversed(cx_pairs):
+        c.CX(control, target)
+    for _, inverse, q in reversed(basis_change):
+        c.add_gate(inverse, [q])
 
     return c
@@ -17,8 +17,8 @@ from pytket.utils.outcomearray import OutcomeArray
 from pytket import Bit, Qubit
 from typing import NamedTuple, Counter
 from enum import Enum
-from .steane_corrections import syndrome_from_readout, readout_correction
-import re
+from .steane_corrections import readout_correction_batch, syndromes_from_readouts
+import numpy as np
 
 
 class ReadoutMode(Enum):
@@ -94,7 +94,7 @@ class InterpretOptions(NamedTuple):
 #     return readout_
 
 
-def l2p(i: int | Qubit | Bit) -> list[int]:
+def l2p(i: int | Qubit | Bit) -> slice:
     """Index convertor for the qubit register.
 
     Args:
@@ -102,13 +102,12 @@ def l2p(i: int | Qubit | Bit) -> list[int]:
             Logical qubit index.
 
     Returns:
-        List of indices of the corresponding physical qubits/bits.
+        Slice of the indices of the corresponding physical qubits/bits.
     """
-    i_ = i
-    if isinstance(i, (Qubit, Bit)):
-        i_ = i.index[0]
-    r = slice(7 * i_, 7 * (i_ + 1))
-    return r
+    # Qubit and Bit both carry an index, an int does not.
+    index = getattr(i, "index", None)
+    i_ = i if index is None else index[0]
+    return slice(7 * i_, 7 * i_ + 7)
 
 
 def get_decoded_result(
@@ -117,48 +116,50 @@ def get_decoded_result(
 ) -> BackendResult:
     assert readout_mode.value in [0, 1, 2]
     rng = "c"
-    bitlist = result.get_bitlist()
-    # Chose the data bit register.
-    cbits = [b for b in bitlist if b.reg_name == rng]
+    # Chose the data bit register and the error detection bits in one scan.
+    cbits = []
+    discard_bits = []
+    for b in result.get_bitlist():
+        if b.reg_name == rng:
+            cbits.append(b)
+        elif b.reg_name.startswith("iceberg_discard_b"):
+            discard_bits.append(b)
     l_data = len(cbits)
     n_logical_qubits = l_data // 7
-    # Error detection bits.
-    cbits += [b for b in bitlist if re.match("iceberg_discard_b", b.reg_name)]
+    cbits += discard_bits
     # Interpret the physical results.
     counts = result.get_counts(cbits=cbits)
-    logical_counts = Counter()
-    for readout0, val in counts.items():
-        # Post selection by the error detection.
-        if sum(readout0[l_data:]) > 0:
-            continue
-        # Use the readout as it is.
-        if readout_mode == ReadoutMode.Raw:
-            readout = readout0[:l_data]
-        # Readout error detection.
-        elif readout_mode == ReadoutMode.Detect:
-            error_detected = False
-            for il in range(n_logical_qubits):
-                syndrome = syndrome_from_readout(readout0[il * 7 : il * 7 + 7])
-                if sum(syndrome) > 0:
-                    error_detected = True
-                    break
-            if error_detected:
-                continue
-            else:
-                readout = readout0[:l_data]
-        # Readout error correction.
-        elif readout_mode == ReadoutMode.Correct:
-            readout: list[int] = []
-            for il in range(n_logical_qubits):
-                readout += list(readout_correction(readout0[il * 7 : il * 7 + 7]))
-        else:
-            raise RuntimeError()
-        lreadout: list[int] = []
-        for i in range(len(cbits[:l_data]) // 7):
-            parity: int = int((-1) ** int(sum(readout[l2p(i)])))
-            lreadout.append((1 - parity) // 2)
-        logical_readout = tuple(lreadout)
-        logical_counts[OutcomeArray.from_readouts([logical_readout])] += int(val)
+    # One row per distinct readout, decoded in a single batch.
+    readouts = np.array(list(counts.keys()), dtype=np.uint8).reshape(
+        len(counts), len(cbits)
+    )
+    shots = np.array(list(counts.values()), dtype=np.int64)
+    data_blocks = readouts[:, :l_data].reshape(-1, 7)
+    # Post selection by the error detection.
+    accepted = ~readouts[:, l_data:].any(axis=1)
+    # Readout error detection.
+    if readout_mode == ReadoutMode.Detect:
+        accepted &= (
+            ~syndromes_from_readouts(data_blocks)
+            .reshape(len(readouts), 3 * n_logical_qubits)
+            .any(axis=1)
+        )
+    # Readout error correction.
+    if readout_mode == ReadoutMode.Correct:
+        data_blocks = readout_correction_batch(data_blocks)
+    # Logical readout: the parity of each block of 7.
+    logical_readouts = (
+        data_blocks.reshape(len(readouts), n_logical_qubits, 7).sum(axis=2) & 1
+    )[accepted]
+    outcomes, index = np.unique(logical_readouts, axis=0, return_inverse=True)
+    totals = np.zeros(len(outcomes), dtype=np.int64)
+    np.add.at(totals, index.reshape(-1), shots[accepted])
+    logical_counts = Counter(
+        {
+            OutcomeArray.from_readouts([tuple(outcome)]): total
+            for outcome, total in zip(outcomes.tolist(), totals.tolist())
+        }
+    )
     logical_result = BackendResult(counts=logical_counts)
     return logical_result
 
@@ -12,28 +12,27 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from pytket.circuit import Circuit, OpType, Qubit, Bit
-from typing import List, NamedTuple, Dict
+from pytket.circuit import Circuit, Op, OpType, Qubit, Bit
+from typing import Callable, List, NamedTuple, Dict, Tuple
 from enum import Enum
 from itertools import chain
 from .basic_gates import (
-    get_H,
-    get_X,
-    get_Y,
-    get_Z,
-    get_S,
-    get_Sdg,
-    get_V,
-    get_Vdg,
-    get_CX,
+    _TRANSVERSAL_GATES,
+    _add_transversal,
+    _add_CX,
     get_Measure,
     get_Pauli_exponential,
 )
 
-from .steane_corrections import steane_z_correction, steane_x_correction
-from .iceberg_detections import iceberg_detect_x, iceberg_detect_z, iceberg_detect_zx
+from .steane_corrections import _get_steane_z_correction, _get_steane_x_correction
+from .iceberg_detections import (
+    _get_iceberg_detect_x,
+    _get_iceberg_detect_z,
+    _get_iceberg_detect_zx,
+)
 from .rz_encoding import RzDirect, RzKNonFt, RzKMeasFt, RzKPartFt
-from .state_prep import get_non_ft_prep
+from .state_prep import _get_non_ft_prep
+from ._utils import add_qubits, add_bits
 
 
 class RzMode(Enum):
@@ -137,6 +136,8 @@ class EncodeOptions(NamedTuple):
             Enable FT state preparation for the Rz gate teleportation gadget.
         ft_rus_gate:
             Number of RUS for the FT state preparation for the Rz gate teleportation.
+        steane_guard:
+            Skip the Steane decoding and correction when every ancilla bit reads zero.
     """
 
     # Non-FT (Rz including T) operation.
@@ -157,6 +158,29 @@ class EncodeOptions(NamedTuple):
     ft_prep_gate: bool = False
     n_rus_gate: int = 1
 
+    # Guard the Steane decoding on a non-zero ancilla readout
+    steane_guard: bool = False
+
+
+# iceberg cycle custom gate name -> detection circuit builder and stabilizer index
+_ICEBERG_DETECTIONS: Dict[str, Tuple[Callable[..., Circuit], int]] = {
+    f"iceberg_{kind}_{index}_detect": (detect, index)
+    for kind, detect in (
+        ("w", _get_iceberg_detect_zx),
+        ("x", _get_iceberg_detect_x),
+        ("z", _get_iceberg_detect_z),
+    )
+    for index in range(3)
+}
+
+
+# Rz phase -> the logical Clifford it is, up to a global phase
+_CLIFFORD_RZ: Dict[float, OpType] = {
+    0.5: OpType.S,
+    1.0: OpType.Z,
+    1.5: OpType.Sdg,
+}
+
 
 def get_encoded_circuit(
     circuit: Circuit,
@@ -170,6 +194,7 @@ def get_encoded_circuit(
     n_rus_synd: int = 1,
     ft_prep_gate: bool = False,
     n_rus_gate: int = 1,
+    steane_guard: bool = False,
 ) -> Circuit:
     """
     Given a pytket circuit and an Rz gate implementation, returns a new
@@ -205,14 +230,15 @@ def get_encoded_circuit(
     no_detected_error_bit: Bit = Bit("no_detected_error", 0)
     goto_bit: Bit = Bit("goto_b", 0)
     register_bit: Bit = Bit("register_b", 0)
+    steane_guard_bit: Bit = Bit("steane_guard_b", 0)
     flag_bit: Bit = Bit("flag", 0)
     condition_bit: Bit = Bit("condition", 0)
 
     # add suitable qubits/bits to some circuit
     encoded_circuit: Circuit = Circuit()
-    for q in list(chain(*get_data_qubits.values())) + ancilla_qubits:
-        encoded_circuit.add_qubit(q)
-    for b in (
+    add_qubits(encoded_circuit, list(chain(*get_data_qubits.values())) + ancilla_qubits)
+    add_bits(
+        encoded_circuit,
         rz_ancilla_bits
         + rz_syndrome_bits
         + steane_ancilla_bits
@@ -225,149 +251,144 @@ def get_encoded_circuit(
             register_bit,
             flag_bit,
             condition_bit,
-        ]
-    ):
-        encoded_circuit.add_bit(b)
+        ],
+    )
+    if steane_guard:
+        encoded_circuit.add_bit(steane_guard_bit)
+
+    # the Steane and iceberg cycle circuits are cached on their registers
+    steane_cycle_args: Tuple = (
+        tuple(ancilla_qubits),
+        tuple(steane_ancilla_bits),
+        tuple(steane_syndrome_bits),
+        goto_qubit,
+        goto_bit,
+        register_bit,
+        n_rus_synd - 1,
+        steane_guard_bit if steane_guard else None,
+    )
+    iceberg_ancilla_qubits: Tuple[Qubit, ...] = tuple(ancilla_qubits[:2])
+    iceberg_ancilla_bits: Tuple[Bit, ...] = tuple(iceberg_syndrome_bits)
+    # and the cached circuits take each logical qubit's data register as a tuple
+    data_qubit_tuples: Dict[Qubit, Tuple[Qubit, ...]] = {
+        q: tuple(qs) for q, qs in get_data_qubits.items()
+    }
+
+    # every gate and gadget below goes through these two, so look them up once
+    append: Callable[[Circuit], None] = encoded_circuit.append
+    add_barrier: Callable[..., Circuit] = encoded_circuit.add_barrier
 
     # non-FT prep for each qubit
     # TODO: add option for FT (don't need it for immediate runs)
-    for qs in get_data_qubits.values():
-        encoded_circuit.append(get_non_ft_prep(qs))
+    for qs in data_qubit_tuples.values():
+        append(_get_non_ft_prep(qs))
+
+    # the Rz gadget and its registers only depend on the mode, so they are picked
+    # once, on the first Rz that needs a gadget: rz_options is only read then
+    rz_gadget: Tuple[Callable[..., Circuit], Tuple] | None = None
+
+    def get_rz_gadget() -> Tuple[Callable[..., Circuit], Tuple]:
+        match rz_mode:
+            case RzMode.DIRECT:
+                return RzDirect.get_circuit, ()
+            case RzMode.BIN_FRAC_NON_FT:
+                return RzKNonFt(rz_options.max_bits).get_circuit, (
+                    ancilla_qubits,
+                    rz_ancilla_bits,
+                    no_detected_error_bit,
+                    True,
+                )
+            case RzMode.BIN_FRAC_MEAS_FT:
+                return RzKMeasFt(rz_options.max_bits).get_circuit, (
+                    ancilla_qubits,
+                    rz_ancilla_bits,
+                    rz_syndrome_bits,
+                    no_detected_error_bit,
+                    True,
+                )
+            case RzMode.BIN_FRAC_PART_FT:
+                return RzKPartFt(rz_options.max_rus, rz_options.max_bits).get_circuit, (
+                    ancilla_qubits,
+                    rz_ancilla_bits,
+                    prep_qubits,
+                    part_ft_syndrome_bits,
+                    flag_bit,
+                    condition_bit,
+                    True,
+                )
+            case _:
+                assert False
+
+    def add_rz(phase: float, data_qubits: List[Qubit]) -> None:
+        nonlocal rz_gadget
+        # Clifford phases are transversal gates, no Rz gadget needed
+        if phase % 2 in _CLIFFORD_RZ:
+            _add_transversal(encoded_circuit, _CLIFFORD_RZ[phase % 2], data_qubits)
+            return
+        if rz_gadget is None:
+            rz_gadget = get_rz_gadget()
+        gadget, gadget_args = rz_gadget
+        append(gadget(phase, data_qubits, *gadget_args))
+
+    # Consecutive Rz on a logical qubit are merged into one, as each costs a whole
+    # encoded Rz gadget: an Rz is only added once another gate acts on its qubit,
+    # or at the end. Rz adding up to a multiple of 2 are dropped.
+    pending_rz: Dict[Qubit, float] = {}
+
+    def flush_rz(qubits: List[Qubit]) -> None:
+        for q in qubits:
+            if q in pending_rz:
+                phase: float = pending_rz.pop(q)
+                if phase % 2:
+                    add_rz(phase, get_data_qubits[q])
 
     for command in circuit.get_commands():
-        match command.op.type:
+        # Command.qubits builds a new list on every access, so read it once
+        op: Op = command.op
+        qubits: List[Qubit] = command.qubits
+        if op.type not in (OpType.Rz, OpType.T, OpType.Tdg):
+            flush_rz(qubits)
+        match op.type:
             case OpType.Barrier:
                 # TODO: Include bits
                 assert len(command.bits) == 0
                 all_qubits: List[Qubit] = []
-                for q in command.qubits:
+                for q in qubits:
                     assert q in get_data_qubits
                     all_qubits.extend(get_data_qubits[q])
-                encoded_circuit.add_barrier(all_qubits)
+                add_barrier(all_qubits)
 
             # all custom gates should correspond to detection/correction cycles
             # any others are rejected
             case OpType.CustomGate:
-                assert len(command.qubits) == 1
-                assert command.qubits[0] in get_data_qubits
-                data_qubits: List[Qubit] = get_data_qubits[command.qubits[0]]
+                assert len(qubits) == 1
+                assert qubits[0] in get_data_qubits
+                data_qubits: List[Qubit] = get_data_qubits[qubits[0]]
+                data_qubit_tuple: Tuple[Qubit, ...] = data_qubit_tuples[qubits[0]]
                 # match on name of custom gate to add correct correction/detection cycle
-                match command.op.name:
+                match op.name:
                     case "steane_z_correct":
-                        encoded_circuit.append(
-                            steane_z_correction(
-                                data_qubits,
-                                ancilla_qubits,
-                                steane_ancilla_bits,
-                                steane_syndrome_bits,
-                                goto_qubit,
-                                goto_bit,
-                                register_bit,
-                                n_rus_synd - 1,
+                        append(
+                            _get_steane_z_correction(
+                                data_qubit_tuple, *steane_cycle_args
                             )
                         )
 
                     case "steane_x_correct":
-                        encoded_circuit.append(
-                            steane_x_correction(
-                                data_qubits,
-                                ancilla_qubits,
-                                steane_ancilla_bits,
-                                steane_syndrome_bits,
-                                goto_qubit,
-                                goto_bit,
-                                register_bit,
-                                n_rus_synd - 1,
+                        append(
+                            _get_steane_x_correction(
+                                data_qubit_tuple, *steane_cycle_args
                             )
                         )
 
-                    case "iceberg_w_0_detect":
-                        encoded_circuit.append(
-                            iceberg_detect_zx(
-                                0,
-                                data_qubits,
-                                ancilla_qubits[:2],
-                                iceberg_syndrome_bits,
-                                iceberg_discard_bit,
-                            )
-                        )
-                    case "iceberg_w_1_detect":
-                        encoded_circuit.append(
-                            iceberg_detect_zx(
-                                1,
-                                data_qubits,
-                                ancilla_qubits[:2],
-                                iceberg_syndrome_bits,
-                                iceberg_discard_bit,
-                            )
-                        )
-                    case "iceberg_w_2_detect":
-                        encoded_circuit.append(
-                            iceberg_detect_zx(
-                                2,
-                                data_qubits,
-                                ancilla_qubits[:2],
-                                iceberg_syndrome_bits,
-                                iceberg_discard_bit,
-                            )
-                        )
-                    case "iceberg_x_0_detect":
-                        encoded_circuit.append(
-                            iceberg_detect_x(
-                                0,
-                                data_qubits,
-                                ancilla_qubits[:2],
-                                iceberg_syndrome_bits,
-                                iceberg_discard_bit,
-                            )
-                        )
-                    case "iceberg_x_1_detect":
-                        encoded_circuit.append(
-                            iceberg_detect_x(
-                                1,
-                                data_qubits,
-                                ancilla_qubits[:2],
-                                iceberg_syndrome_bits,
-                                iceberg_discard_bit,
-                            )
-                        )
-                    case "iceberg_x_2_detect":
-                        encoded_circuit.append(
-                            iceberg_detect_x(
-                                2,
-                                data_qubits,
-                                ancilla_qubits[:2],
-                                iceberg_syndrome_bits,
-                                iceberg_discard_bit,
-                            )
-                        )
-                    case "iceberg_z_0_detect":
-                        encoded_circuit.append(
-                            iceberg_detect_z(
-                                0,
-                                data_qubits,
-                                ancilla_qubits[:2],
-                                iceberg_syndrome_bits,
-                                iceberg_discard_bit,
-                            )
-                        )
-                    case "iceberg_z_1_detect":
-                        encoded_circuit.append(
-                            iceberg_detect_z(
-                                1,
-                                data_qubits,
-                                ancilla_qubits[:2],
-                                iceberg_syndrome_bits,
-                                iceberg_discard_bit,
-                            )
-                        )
-                    case "iceberg_z_2_detect":
-                        encoded_circuit.append(
-                            iceberg_detect_z(
-                                2,
-                                data_qubits,
-                                ancilla_qubits[:2],
-                                iceberg_syndrome_bits,
+                    case name if name in _ICEBERG_DETECTIONS:
+                        detect, index = _ICEBERG_DETECTIONS[name]
+                        append(
+                            detect(
+                                index,
+                                data_qubit_tuple,
+                                iceberg_ancilla_qubits,
+                                iceberg_ancilla_bits,
                                 iceberg_discard_bit,
                             )
                         )
@@ -378,232 +399,52 @@ def get_encoded_circuit(
                         assert False
 
             # end cycle adding based on custom gate choice
-            case OpType.Rz:
-                assert len(command.op.params) == 1
-                phase: float = command.op.params[0]
-                assert len(command.qubits) == 1
-                assert command.qubits[0] in get_data_qubits
-                data_qubits: List[Qubit] = get_data_qubits[command.qubits[0]]
-                match rz_mode:
-                    case RzMode.DIRECT:
-                        encoded_circuit.append(RzDirect.get_circuit(phase, data_qubits))
-                    case RzMode.BIN_FRAC_NON_FT:
-                        encoded_circuit.append(
-                            RzKNonFt(rz_options.max_bits).get_circuit(
-                                phase,
-                                data_qubits,
-                                ancilla_qubits,
-                                rz_ancilla_bits,
-                                no_detected_error_bit,
-                                True,
-                            )
-                        )
-                    case RzMode.BIN_FRAC_MEAS_FT:
-                        encoded_circuit.append(
-                            RzKMeasFt(rz_options.max_bits).get_circuit(
-                                phase,
-                                data_qubits,
-                                ancilla_qubits,
-                                rz_ancilla_bits,
-                                rz_syndrome_bits,
-                                no_detected_error_bit,
-                                True,
-                            )
-                        )
-                    case RzMode.BIN_FRAC_PART_FT:
-                        encoded_circuit.append(
-                            RzKPartFt(
-                                rz_options.max_rus, rz_options.max_bits
-                            ).get_circuit(
-                                phase,
-                                data_qubits,
-                                ancilla_qubits,
-                                rz_ancilla_bits,
-                                prep_qubits,
-                                part_ft_syndrome_bits,
-                                flag_bit,
-                                condition_bit,
-                                True,
-                            )
-                        )
-                    case _:
-                        assert False
-
-            case OpType.T:
-                assert len(command.qubits) == 1
-                assert command.qubits[0] in get_data_qubits
-                phase: float = 0.25
-                data_qubits: List[Qubit] = get_data_qubits[command.qubits[0]]
-                match rz_mode:
-                    case RzMode.DIRECT:
-                        encoded_circuit.append(
-                            RzDirect().get_circuit(phase, data_qubits)
-                        )
-                    case RzMode.BIN_FRAC_NON_FT:
-                        encoded_circuit.append(
-                            RzKNonFt(rz_options.max_bits).get_circuit(
-                                phase,
-                                data_qubits,
-                                ancilla_qubits,
-                                rz_ancilla_bits,
-                                no_detected_error_bit,
-                                True,
-                            )
-                        )
-                    case RzMode.BIN_FRAC_MEAS_FT:
-                        encoded_circuit.append(
-                            RzKMeasFt(rz_options.max_bits).get_circuit(
-                                phase,
-                                data_qubits,
-                                ancilla_qubits,
-                                rz_ancilla_bits,
-                                rz_syndrome_bits,
-                                no_detected_error_bit,
-                                True,
-                            )
-                        )
-                    case RzMode.BIN_FRAC_PART_FT:
-                        encoded_circuit.append(
-                            RzKPartFt(
-                                rz_options.max_rus, rz_options.max_bits
-                            ).get_circuit(
-                                phase,
-                                data_qubits,
-                                ancilla_qubits,
-                                rz_ancilla_bits,
-                                prep_qubits,
-                                part_ft_syndrome_bits,
-                                flag_bit,
-                                condition_bit,
-                                True,
-                            )
-                        )
-                    case _:
-                        assert False
-
-            case OpType.Tdg:
-                assert len(command.qubits) == 1
-                assert command.qubits[0] in get_data_qubits
-                phase: float = -0.25
-                data_qubits: List[Qubit] = get_data_qubits[command.qubits[0]]
-                match rz_mode:
-                    case RzMode.DIRECT:
-                        encoded_circuit.append(
-                            RzDirect().get_circuit(phase, data_qubits)
-                        )
-
-                    case RzMode.BIN_FRAC_NON_FT:
-                        encoded_circuit.append(
-                            RzKNonFt(rz_options.max_bits).get_circuit(
-                                phase,
-                                data_qubits,
-                                ancilla_qubits,
-                                rz_ancilla_bits,
-                                no_detected_error_bit,
-                                True,
-                            )
-                        )
-                    case RzMode.BIN_FRAC_MEAS_FT:
-                        encoded_circuit.append(
-                            RzKMeasFt(rz_options.max_bits).get_circuit(
-                                phase,
-                                data_qubits,
-                                ancilla_qubits,
-                                rz_ancilla_bits,
-                                rz_syndrome_bits,
-                                no_detected_error_bit,
-                                True,
-                            )
-                        )
-                    case RzMode.BIN_FRAC_PART_FT:
-                        encoded_circuit.append(
-                            RzKPartFt(
-                                rz_options.max_rus, rz_options.max_bits
-                            ).get_circuit(
-                                phase,
-                                data_qubits,
-                                ancilla_qubits,
-                                rz_ancilla_bits,
-                                prep_qubits,
-                                part_ft_syndrome_bits,
-                                flag_bit,
-                                condition_bit,
-                                True,
-                            )
-                        )
-                    case _:
-                        assert False
+            # T and Tdg are Rz(0.25) and Rz(-0.25) up to a global phase
+            case OpType.Rz | OpType.T | OpType.Tdg:
+                assert len(qubits) == 1
+                assert qubits[0] in get_data_qubits
+                if op.type == OpType.Rz:
+                    assert len(op.params) == 1
+                    phase: float = op.params[0]
+                else:
+                    phase: float = 0.25 if op.type == OpType.T else -0.25
+                # held back and merged with any later Rz on the same qubit
+                qubit: Qubit = qubits[0]
+                pending_rz[qubit] = pending_rz.get(qubit, 0) + phase
 
             case OpType.PauliExpBox:
                 all_qubits: List[Qubit] = []
-                for q in command.qubits:
+                for q in qubits:
                     assert q in get_data_qubits
                     all_qubits.append(get_data_qubits[q])
-                encoded_circuit.append(
-                    get_Pauli_exponential(
-                        all_qubits, command.op.get_paulis(), command.op.get_phase()
-                    )
+                append(
+                    get_Pauli_exponential(all_qubits, op.get_paulis(), op.get_phase())
                 )
 
-            case OpType.X:
-                assert len(command.qubits) == 1
-                assert command.qubits[0] in get_data_qubits
-                encoded_circuit.append(get_X(get_data_qubits[command.qubits[0]]))
-
-            case OpType.Y:
-                assert len(command.qubits) == 1
-                assert command.qubits[0] in get_data_qubits
-                encoded_circuit.append(get_Y(get_data_qubits[command.qubits[0]]))
-
-            case OpType.Z:
-                assert len(command.qubits) == 1
-                assert command.qubits[0] in get_data_qubits
-                encoded_circuit.append(get_Z(get_data_qubits[command.qubits[0]]))
-
-            case OpType.H:
-                assert len(command.qubits) == 1
-                assert command.qubits[0] in get_data_qubits
-                encoded_circuit.append(get_H(get_data_qubits[command.qubits[0]]))
-
-            case OpType.S:
-                assert len(command.qubits) == 1
-                assert command.qubits[0] in get_data_qubits
-                encoded_circuit.append(get_S(get_data_qubits[command.qubits[0]]))
-
-            case OpType.Sdg:
-                assert len(command.qubits) == 1
-                assert command.qubits[0] in get_data_qubits
-                encoded_circuit.append(get_Sdg(get_data_qubits[command.qubits[0]]))
-
-            case OpType.V:
-                assert len(command.qubits) == 1
-                assert command.qubits[0] in get_data_qubits
-                encoded_circuit.append(get_V(get_data_qubits[command.qubits[0]]))
-
-            case OpType.Vdg:
-                assert len(command.qubits) == 1
-                assert command.qubits[0] in get_data_qubits
-                encoded_circuit.append(get_Vdg(get_data_qubits[command.qubits[0]]))
+            # transversal single qubit gates go straight onto the encoded circuit
+            case op_type if op_type in _TRANSVERSAL_GATES:
+                assert len(qubits) == 1
+                assert qubits[0] in get_data_qubits
+                _add_transversal(encoded_circuit, op_type, get_data_qubits[qubits[0]])
 
             case OpType.CX:
-                assert len(command.qubits) == 2
-                assert command.qubits[0] in get_data_qubits
-                assert command.qubits[1] in get_data_qubits
-                encoded_circuit.append(
-                    get_CX(
-                        get_data_qubits[command.qubits[0]],
-                        get_data_qubits[command.qubits[1]],
-                    )
+                assert len(qubits) == 2
+                assert qubits[0] in get_data_qubits
+                assert qubits[1] in get_data_qubits
+                _add_CX(
+                    encoded_circuit,
+                    get_data_qubits[qubits[0]],
+                    get_data_qubits[qubits[1]],
                 )
 
             case OpType.Measure:
-                assert len(command.qubits) == 1
+                assert len(qubits) == 1
                 assert len(command.bits) == 1
-                assert command.qubits[0] in get_data_qubits
+                assert qubits[0] in get_data_qubits
                 assert command.bits[0] in get_data_bits
-                qbs: List[Qubit] = get_data_qubits[command.qubits[0]]
-                encoded_circuit.add_barrier(qbs)
-                encoded_circuit.append(
+                qbs: List[Qubit] = get_data_qubits[qubits[0]]
+                add_barrier(qbs)
+                append(
                     get_Measure(
                         qbs,
                         get_data_bits[command.bits[0]],
@@ -611,6 +452,7 @@ def get_encoded_circuit(
                 )
             case _:
                 assert False
+    flush_rz(list(pending_rz))
     encoded_circuit.remove_blank_wires()
     return encoded_circuit
 
@@ -645,4 +487,5 @@ def encode(
         n_rus_synd=options.n_rus_synd,
         ft_prep_gate=options.ft_prep_gate,
         n_rus_gate=options.n_rus_gate,
+        steane_guard=options.steane_guard,
     )
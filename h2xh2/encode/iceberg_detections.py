@@ -12,75 +12,75 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from pytket.circuit import Qubit, Bit, Circuit, ClBitVar, ClExpr, ClOp, WiredClExpr
+from pytket.circuit import Qubit, Bit, Circuit
 from typing import List, Tuple
+from functools import lru_cache
+from ._utils import STABILIZER_SUPPORTS, bit_or_all, add_qubits, add_bits, add_resets
 
 
+# Every detection cycle on a logical qubit rebuilds the same circuit, so each one is
+# built once and copied, as for the prep circuits in state_prep. The cached
+# _get_* builders return a shared instance that must only be appended.
 def iceberg_detect_x(
     index: int,
     data_qubits: List[Qubit],
     ancilla_qubits: List[Qubit],
     ancilla_bits: List[Bit],
     discard_bit: Bit,
+) -> Circuit:
+    return _get_iceberg_detect_x(
+        index,
+        tuple(data_qubits),
+        tuple(ancilla_qubits),
+        tuple(ancilla_bits),
+        discard_bit,
+    ).copy()
+
+
+@lru_cache(maxsize=128)
+def _get_iceberg_detect_x(
+    index: int,
+    data_qubits: Tuple[Qubit, ...],
+    ancilla_qubits: Tuple[Qubit, ...],
+    ancilla_bits: Tuple[Bit, ...],
+    discard_bit: Bit,
 ) -> Circuit:
     assert len(data_qubits) == 7
     assert len(ancilla_qubits) == 2
     assert len(ancilla_bits) == 2
     detection: Circuit = Circuit()
-    scratch_bits: List[Bit] = [Bit("scratch", 0), Bit("scratch", 1)]
-    for q in data_qubits + ancilla_qubits:
-        detection.add_qubit(q)
-    for b in ancilla_bits + scratch_bits + [discard_bit]:
-        detection.add_bit(b)
-
-    detection.add_barrier(data_qubits + ancilla_qubits)
-    for q in ancilla_qubits:
-        detection.Reset(q)
-    # XXXXIII -> 0, 1, 2, 3
-    # IXXIXXI -> 1, 2, 4, 5
-    # IIXXIXX -> 2, 3, 5, 6
-    stabilizer_indices: Tuple[Tuple[int, int, int]] = (
-        (0, 1, 2, 3),
-        (1, 2, 4, 5),
-        (2, 3, 5, 6),
-    )
+    scratch_bit: Bit = Bit("scratch", 0)
+    all_qubits: Tuple[Qubit, ...] = data_qubits + ancilla_qubits
+    add_qubits(detection, all_qubits)
+    add_bits(detection, ancilla_bits + (scratch_bit, discard_bit))
+
+    detection.add_barrier(all_qubits)
+    add_resets(detection, ancilla_qubits)
     # The X detection circuit is written to 4 qubits
     # These 4 qubits depend on the chosen "index"
-    acting_qubits: List[Qubit] = [data_qubits[i] for i in stabilizer_indices[index]]
+    acting_qubits: List[Qubit] = [data_qubits[i] for i in STABILIZER_SUPPORTS[index]]
     assert len(acting_qubits) == 4
     detection.H(ancilla_qubits[0])
     detection.CX(ancilla_qubits[0], acting_qubits[0])
-    detection.add_barrier(data_qubits + ancilla_qubits)
+    detection.add_barrier(all_qubits)
     detection.CX(ancilla_qubits[0], ancilla_qubits[1])
-    detection.add_barrier(data_qubits + ancilla_qubits)
+    detection.add_barrier(all_qubits)
     detection.CX(ancilla_qubits[0], acting_qubits[1])
-    detection.add_barrier(data_qubits + ancilla_qubits)
+    detection.add_barrier(all_qubits)
     detection.CX(ancilla_qubits[0], acting_qubits[2])
-    detection.add_barrier(data_qubits + ancilla_qubits)
+    detection.add_barrier(all_qubits)
     detection.CX(ancilla_qubits[0], ancilla_qubits[1])
-    detection.add_barrier(data_qubits + ancilla_qubits)
+    detection.add_barrier(all_qubits)
     detection.CX(ancilla_qubits[0], acting_qubits[3])
     detection.H(ancilla_qubits[0])
     detection.Measure(ancilla_qubits[0], ancilla_bits[0])
     detection.Measure(ancilla_qubits[1], ancilla_bits[1])
 
     detection.add_clexpr(
-        WiredClExpr(
-            expr=ClExpr(op=ClOp.BitOr, args=[ClBitVar(i) for i in range(2)]),
-            bit_posn={i: i for i in range(2)},
-            output_posn=[2],
-        ),
-        [ancilla_bits[0], ancilla_bits[1], scratch_bits[0]],
+        bit_or_all(3),
+        [ancilla_bits[0], ancilla_bits[1], discard_bit, scratch_bit],
     )
-    detection.add_clexpr(
-        WiredClExpr(
-            expr=ClExpr(op=ClOp.BitOr, args=[ClBitVar(i) for i in range(2)]),
-            bit_posn={i: i for i in range(2)},
-            output_posn=[2],
-        ),
-        [scratch_bits[0], discard_bit, scratch_bits[1]],
-    )
-    detection.add_c_copybits([scratch_bits[1]], [discard_bit])
+    detection.add_c_copybits([scratch_bit], [discard_bit])
     return detection
 
 
@@ -90,65 +90,59 @@ def iceberg_detect_z(
     ancilla_qubits: List[Qubit],
     ancilla_bits: List[Bit],
     discard_bit: Bit,
+) -> Circuit:
+    return _get_iceberg_detect_z(
+        index,
+        tuple(data_qubits),
+        tuple(ancilla_qubits),
+        tuple(ancilla_bits),
+        discard_bit,
+    ).copy()
+
+
+@lru_cache(maxsize=128)
+def _get_iceberg_detect_z(
+    index: int,
+    data_qubits: Tuple[Qubit, ...],
+    ancilla_qubits: Tuple[Qubit, ...],
+    ancilla_bits: Tuple[Bit, ...],
+    discard_bit: Bit,
 ) -> Circuit:
     assert len(data_qubits) == 7
     assert len(ancilla_qubits) == 2
     assert len(ancilla_bits) == 2
     detection: Circuit = Circuit()
-    scratch_bits: List[Bit] = [Bit("scratch", 0), Bit("scratch", 1)]
-    for q in data_qubits + ancilla_qubits:
-        detection.add_qubit(q)
-    for b in ancilla_bits + scratch_bits + [discard_bit]:
-        detection.add_bit(b)
-
-    detection.add_barrier(data_qubits + ancilla_qubits)
-    for q in ancilla_qubits:
-        detection.Reset(q)
-
-    # ZZZZIII -> 0, 1, 2, 3
-    # IZZIZZI -> 1, 2, 4, 5
-    # IIZZIZZ -> 2, 3, 5, 6
-    stabilizer_indices: Tuple[Tuple[int, int, int]] = (
-        (0, 1, 2, 3),
-        (1, 2, 4, 5),
-        (2, 3, 5, 6),
-    )
+    scratch_bit: Bit = Bit("scratch", 0)
+    all_qubits: Tuple[Qubit, ...] = data_qubits + ancilla_qubits
+    add_qubits(detection, all_qubits)
+    add_bits(detection, ancilla_bits + (scratch_bit, discard_bit))
+
+    detection.add_barrier(all_qubits)
+    add_resets(detection, ancilla_qubits)
 
-    acting_qubits: List[Qubit] = [data_qubits[i] for i in stabilizer_indices[index]]
+    acting_qubits: List[Qubit] = [data_qubits[i] for i in STABILIZER_SUPPORTS[index]]
     assert len(acting_qubits) == 4
     detection.H(ancilla_qubits[1])
     detection.CX(acting_qubits[0], ancilla_qubits[0])
-    detection.add_barrier(data_qubits + ancilla_qubits)
+    detection.add_barrier(all_qubits)
     detection.CX(ancilla_qubits[1], ancilla_qubits[0])
-    detection.add_barrier(data_qubits + ancilla_qubits)
+    detection.add_barrier(all_qubits)
     detection.CX(acting_qubits[1], ancilla_qubits[0])
-    detection.add_barrier(data_qubits + ancilla_qubits)
+    detection.add_barrier(all_qubits)
     detection.CX(acting_qubits[2], ancilla_qubits[0])
-    detection.add_barrier(data_qubits + ancilla_qubits)
+    detection.add_barrier(all_qubits)
     detection.CX(ancilla_qubits[1], ancilla_qubits[0])
-    detection.add_barrier(data_qubits + ancilla_qubits)
+    detection.add_barrier(all_qubits)
     detection.CX(acting_qubits[3], ancilla_qubits[0])
     detection.H(ancilla_qubits[1])
     detection.Measure(ancilla_qubits[0], ancilla_bits[0])
     detection.Measure(ancilla_qubits[1], ancilla_bits[1])
 
     detection.add_clexpr(
-        WiredClExpr(
-            expr=ClExpr(op=ClOp.BitOr, args=[ClBitVar(i) for i in range(2)]),
-            bit_posn={i: i for i in range(2)},
-            output_posn=[2],
-        ),
-        [ancilla_bits[0], ancilla_bits[1], scratch_bits[0]],
-    )
-    detection.add_clexpr(
-        WiredClExpr(
-            expr=ClExpr(op=ClOp.BitOr, args=[ClBitVar(i) for i in range(2)]),
-            bit_posn={i: i for i in range(2)},
-            output_posn=[2],
-        ),
-        [scratch_bits[0], discard_bit, scratch_bits[1]],
+        bit_or_all(3),
+        [ancilla_bits[0], ancilla_bits[1], discard_bit, scratch_bit],
     )
-    detection.add_c_copybits([scratch_bits[1]], [discard_bit])
+    detection.add_c_copybits([scratch_bit], [discard_bit])
     return detection
 
 
@@ -158,67 +152,65 @@ def iceberg_detect_zx(
     ancilla_qubits: List[Qubit],
     ancilla_bits: List[Bit],
     discard_bit: Bit,
+) -> Circuit:
+    return _get_iceberg_detect_zx(
+        index,
+        tuple(data_qubits),
+        tuple(ancilla_qubits),
+        tuple(ancilla_bits),
+        discard_bit,
+    ).copy()
+
+
+@lru_cache(maxsize=128)
+def _get_iceberg_detect_zx(
+    index: int,
+    data_qubits: Tuple[Qubit, ...],
+    ancilla_qubits: Tuple[Qubit, ...],
+    ancilla_bits: Tuple[Bit, ...],
+    discard_bit: Bit,
 ) -> Circuit:
     assert len(data_qubits) == 7
     assert len(ancilla_qubits) == 2
     assert len(ancilla_bits) == 2
     detection: Circuit = Circuit()
-    scratch_bits: List[Bit] = [Bit("scratch", 0), Bit("scratch", 1)]
-    for q in data_qubits + ancilla_qubits:
-        detection.add_qubit(q)
-    for b in ancilla_bits + scratch_bits + [discard_bit]:
-        detection.add_bit(b)
-
-    detection.add_barrier(data_qubits + ancilla_qubits)
-    for q in ancilla_qubits:
-        detection.Reset(q)
-
-    stabilizer_indices: Tuple[Tuple[int, int, int]] = (
-        (0, 1, 2, 3),
-        (1, 2, 4, 5),
-        (2, 3, 5, 6),
-    )
+    scratch_bit: Bit = Bit("scratch", 0)
+    all_qubits: Tuple[Qubit, ...] = data_qubits + ancilla_qubits
+    add_qubits(detection, all_qubits)
+    add_bits(detection, ancilla_bits + (scratch_bit, discard_bit))
+
+    detection.add_barrier(all_qubits)
+    add_resets(detection, ancilla_qubits)
+
     # The ZX detection circuit is written to 4 qubits
     # These 4 qubits depend on the chosen "index"
 
-    acting_qubits: List[Qubit] = [data_qubits[i] for i in stabilizer_indices[index]]
+    acting_qubits: List[Qubit] = [data_qubits[i] for i in STABILIZER_SUPPORTS[index]]
     assert len(acting_qubits) == 4
     detection.H(ancilla_qubits[1])
     detection.CX(ancilla_qubits[1], acting_qubits[0])
-    detection.add_barrier(data_qubits + ancilla_qubits)
+    detection.add_barrier(all_qubits)
     detection.CX(acting_qubits[0], ancilla_qubits[0])
-    detection.add_barrier(data_qubits + ancilla_qubits)
+    detection.add_barrier(all_qubits)
     detection.CX(acting_qubits[1], ancilla_qubits[0])
-    detection.add_barrier(data_qubits + ancilla_qubits)
+    detection.add_barrier(all_qubits)
     detection.CX(ancilla_qubits[1], acting_qubits[1])
-    detection.add_barrier(data_qubits + ancilla_qubits)
+    detection.add_barrier(all_qubits)
     detection.CX(ancilla_qubits[1], acting_qubits[2])
-    detection.add_barrier(data_qubits + ancilla_qubits)
+    detection.add_barrier(all_qubits)
     detection.CX(acting_qubits[2], ancilla_qubits[0])
-    detection.add_barrier(data_qubits + ancilla_qubits)
+    detection.add_barrier(all_qubits)
     detection.CX(acting_qubits[3], ancilla_qubits[0])
-    detection.add_barrier(data_qubits + ancilla_qubits)
+    detection.add_barrier(all_qubits)
     detection.CX(ancilla_qubits[1], acting_qubits[3])
     detection.H(ancilla_qubits[1])
     detection.Measure(ancilla_qubits[0], ancilla_bits[0])
     detection.Measure(ancilla_qubits[1], ancilla_bits[1])
 
     detection.add_clexpr(
-        WiredClExpr(
-            expr=ClExpr(op=ClOp.BitOr, args=[ClBitVar(i) for i in range(2)]),
-            bit_posn={i: i for i in range(2)},
-            output_posn=[2],
-        ),
-        [ancilla_bits[0], ancilla_bits[1], scratch_bits[0]],
-    )
-    detection.add_clexpr(
-        WiredClExpr(
-            expr=ClExpr(op=ClOp.BitOr, args=[ClBitVar(i) for i in range(2)]),
-            bit_posn={i: i for i in range(2)},
-            output_posn=[2],
-        ),
-        [scratch_bits[0], discard_bit, scratch_bits[1]],
+        bit_or_all(3),
+        [ancilla_bits[0], ancilla_bits[1], discard_bit, scratch_bit],
     )
-    detection.add_c_copybits([scratch_bits[1]], [discard_bit])
+    detection.add_c_copybits([scratch_bit], [discard_bit])
 
     return detection
@@ -17,16 +17,26 @@ Different Circuit constructions for adding encoded Rz instructions.
 """
 
 from pytket import Bit, Circuit, Qubit
-from pytket.circuit import CircBox, ClBitVar, ClExpr, ClOp, WiredClExpr
-from typing import List
+from pytket.circuit import CircBox, OpType
+from typing import Callable, Dict, List, Tuple
+from functools import lru_cache
 
 from .state_prep import (
     get_non_ft_rz_plus_prep,
-    get_ft_prep,
+    _get_ft_prep,
 )
-from .basic_gates import get_S, get_Z, get_Sdg, get_H, get_CX
+from .basic_gates import get_S, get_Z, get_Sdg, _add_transversal, _add_CX
 from .iceberg_detections import iceberg_detect_zx
-from .steane_corrections import classical_steane_decoding
+from .steane_corrections import _add_classical_steane_decoding
+from ._utils import BIT_OR, BIT_XOR, bit_or_all, add_qubits, add_bits
+
+
+@lru_cache(maxsize=128)
+def _get_ft_prep_cbox(
+    data_qubits: Tuple[Qubit, ...], goto_qubit: Qubit, goto_bit: Bit
+) -> CircBox:
+    # the boxed FT prep only depends on the registers, so share it between calls
+    return CircBox(_get_ft_prep(data_qubits, goto_qubit, goto_bit))
 
 
 class RzEncoding:
@@ -51,8 +61,7 @@ class RzDirect(RzEncoding):
     def get_circuit(phase: float, data_qubits: List[Qubit]) -> Circuit:
         assert len(data_qubits) == 7
         c: Circuit = Circuit()
-        for q in data_qubits:
-            c.add_qubit(q)
+        add_qubits(c, data_qubits)
         c.CX(data_qubits[5], data_qubits[3])
         c.ZZPhase(phase, data_qubits[3], data_qubits[1])
         c.CX(data_qubits[5], data_qubits[3])
@@ -71,10 +80,8 @@ class RzNonFt(RzEncoding):
         assert len(ancilla_qubits) == 7
         assert len(ancilla_bits) == 7
         c: Circuit = Circuit()
-        for q in data_qubits + ancilla_qubits:
-            c.add_qubit(q)
-        for b in ancilla_bits + [flag_bit]:
-            c.add_bit(b)
+        add_qubits(c, data_qubits + ancilla_qubits)
+        add_bits(c, ancilla_bits + [flag_bit])
 
         c.add_barrier(data_qubits + ancilla_qubits)
 
@@ -94,19 +101,11 @@ class RzNonFt(RzEncoding):
         # use ancilla_bits[3] as a scratch bit
         # we know from assertion it exists
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[0], ancilla_bits[1], ancilla_bits[3]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[3], ancilla_bits[2], flag_bit],
         )
         return c
@@ -131,48 +130,35 @@ class RzFtPrep(RzEncoding):
         assert len(ancilla_bits) == 3
         c: Circuit = Circuit()
         scratch_bit: Bit = Bit("scratch", 0)
-        for q in data_qubits + ancilla_qubits + [goto_qubit]:
-            c.add_qubit(q)
-        for b in ancilla_bits + [flag_bit, goto_bit, scratch_bit]:
-            c.add_bit(b)
+        add_qubits(c, data_qubits + ancilla_qubits + [goto_qubit])
+        add_bits(c, ancilla_bits + [flag_bit, goto_bit, scratch_bit])
 
         c.add_barrier(data_qubits + ancilla_qubits + [goto_qubit])
         c.add_c_setbits([True], [goto_bit])
         # RUS Ft |+> Prep
-        ft_prep_cbox: CircBox = CircBox(
-            get_ft_prep(ancilla_qubits, goto_qubit, goto_bit)
+        ft_prep_cbox: CircBox = _get_ft_prep_cbox(
+            tuple(ancilla_qubits), goto_qubit, goto_bit
         )
+        ft_prep_args: List[Qubit | Bit] = ancilla_qubits + [goto_qubit, goto_bit]
         for _ in range(self.max_rus_):
-            c.add_circbox(
-                ft_prep_cbox,
-                ancilla_qubits + [goto_qubit, goto_bit],
-                condition=goto_bit,
-            )
+            c.add_circbox(ft_prep_cbox, ft_prep_args, condition=goto_bit)
         # Non-Ft Rz
-        c.append(get_H(ancilla_qubits))
+        _add_transversal(c, OpType.H, ancilla_qubits)
         c.append(RzDirect.get_circuit(phase, ancilla_qubits))
         # Ancilla Measurement for gate teleportation
-        c.append(get_CX(data_qubits, ancilla_qubits))
+        _add_CX(c, data_qubits, ancilla_qubits)
 
         c.Measure(ancilla_qubits[1], ancilla_bits[0])
         c.Measure(ancilla_qubits[3], ancilla_bits[1])
         c.Measure(ancilla_qubits[5], ancilla_bits[2])
 
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[0], ancilla_bits[1], scratch_bit],
         )
 
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[2], scratch_bit, flag_bit],
         )
         return c
@@ -197,10 +183,8 @@ class RzRusNonFt(RzEncoding):
 
         c: Circuit = Circuit()
         scratch_bit: Bit = Bit("scratch", 0)
-        for q in data_qubits + ancilla_qubits:
-            c.add_qubit(q)
-        for b in ancilla_bits + [condition_bit, discard_bit]:
-            c.add_bit(b)
+        add_qubits(c, data_qubits + ancilla_qubits)
+        add_bits(c, ancilla_bits + [condition_bit, discard_bit])
 
         # we use condition_bit to flag whether an the RUS subcircuit has been successful
         c.add_c_setbits([True], condition_bit)
@@ -220,19 +204,11 @@ class RzRusNonFt(RzEncoding):
         # If RUS is not succesful then discard_bit is false
 
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitOr, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_OR,
             [discard_bit, condition_bit, scratch_bit],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [scratch_bit, condition_bit, discard_bit],
         )
         return c
@@ -254,168 +230,94 @@ class RzMeasFt(RzEncoding):
         assert len(syndrome_bits) == 3
         scratch_bits: List[Bit] = [Bit("scratch", i) for i in range(6)]
         c: Circuit = Circuit()
-        for q in data_qubits + ancilla_qubits:
-            c.add_qubit(q)
-        for b in ancilla_bits + syndrome_bits + scratch_bits + [condition_bit]:
-            c.add_bit(b)
+        add_qubits(c, data_qubits + ancilla_qubits)
+        add_bits(c, ancilla_bits + syndrome_bits + scratch_bits + [condition_bit])
         c.add_barrier(data_qubits + ancilla_qubits)
 
         c.append(get_non_ft_rz_plus_prep(phase, ancilla_qubits))
 
-        c.append(get_CX(data_qubits, ancilla_qubits))
+        _add_CX(c, data_qubits, ancilla_qubits)
         for q, b in zip(ancilla_qubits, ancilla_bits):
             c.Measure(q, b)
 
         # Write parities to syndrome bits
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[0], ancilla_bits[1], scratch_bits[0]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[2], scratch_bits[0], scratch_bits[1]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[3], scratch_bits[1], syndrome_bits[0]],
         )
 
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[1], ancilla_bits[2], scratch_bits[0]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[4], scratch_bits[0], scratch_bits[1]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[5], scratch_bits[1], syndrome_bits[1]],
         )
 
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[2], ancilla_bits[3], scratch_bits[0]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[5], scratch_bits[0], scratch_bits[1]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[6], scratch_bits[1], syndrome_bits[2]],
         )
 
         # Check error
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitOr, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_OR,
             [syndrome_bits[0], syndrome_bits[1], scratch_bits[0]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitOr, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_OR,
             [syndrome_bits[2], scratch_bits[0], syndrome_bits[0]],
         )
 
         # Correct error
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[0], ancilla_bits[1], scratch_bits[0]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[2], scratch_bits[0], scratch_bits[1]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[3], scratch_bits[1], scratch_bits[2]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[4], scratch_bits[2], scratch_bits[3]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[5], scratch_bits[3], scratch_bits[4]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[6], scratch_bits[4], scratch_bits[5]],
         )
 
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [syndrome_bits[0], scratch_bits[5], condition_bit],
         )
 
@@ -438,20 +340,18 @@ class RzPartFt(RzEncoding):
         assert len(ancilla_qubits) == 2
         assert len(syndrome_bits) == 5
 
-        scratch_bits: List[Bit] = [Bit("scratch", i) for i in range(3)]
-
         c: Circuit = Circuit()
-        for q in data_qubits + ancilla_qubits:
-            c.add_qubit(q)
-        for b in syndrome_bits + scratch_bits + [flag_bit]:
-            c.add_bit(b)
+        add_qubits(c, data_qubits + ancilla_qubits)
+        add_bits(c, syndrome_bits + [flag_bit])
 
         # Make a repeat circuit
         repeat: Circuit = c.copy()
 
         # Ft |+> Prep
-        repeat.append(get_ft_prep(data_qubits, ancilla_qubits[0], syndrome_bits[0]))
-        repeat.append(get_H(data_qubits))
+        repeat.append(
+            _get_ft_prep(tuple(data_qubits), ancilla_qubits[0], syndrome_bits[0])
+        )
+        _add_transversal(repeat, OpType.H, data_qubits)
         # Rz Gate
         repeat.append(RzDirect.get_circuit(phase, data_qubits))
         # Check for errors
@@ -468,48 +368,16 @@ class RzPartFt(RzEncoding):
         )
 
         # Write error output to flag_bit
-        c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitOr, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
-            [syndrome_bits[0], syndrome_bits[1], scratch_bits[0]],
-        )
-
-        c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitOr, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
-            [syndrome_bits[2], scratch_bits[0], scratch_bits[1]],
-        )
-
-        c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitOr, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
-            [syndrome_bits[3], scratch_bits[1], scratch_bits[2]],
-        )
-
-        c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitOr, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
-            [syndrome_bits[4], scratch_bits[2], flag_bit],
-        )
+        c.add_clexpr(bit_or_all(5), syndrome_bits + [flag_bit])
 
         c.append(repeat)
         # Repeat this until success/max repeats value is hit
+        # The QASM target has no loop construct, so the RUS stays unrolled, but
+        # every iteration refers to the same box.
+        repeat_cbox: CircBox = CircBox(repeat)
+        repeat_args: List[Qubit | Bit] = repeat.qubits + repeat.bits
         for _ in range(self.max_rus_):
-            c.add_circbox(
-                CircBox(repeat), repeat.qubits + repeat.bits, condition=flag_bit
-            )
+            c.add_circbox(repeat_cbox, repeat_args, condition=flag_bit)
 
         return c
 
@@ -533,12 +401,10 @@ class RzPartFt(RzEncoding):
         scratch_bits: List[Bit] = [Bit("scratch", i) for i in range(5)]
 
         c: Circuit = Circuit()
-        for q in data_qubits + ancilla_qubits + prep_qubits:
-            c.add_qubit(q)
-        for b in (
-            ancilla_bits + syndrome_bits + scratch_bits + [flag_bit, condition_bit]
-        ):
-            c.add_bit(b)
+        add_qubits(c, data_qubits + ancilla_qubits + prep_qubits)
+        add_bits(
+            c, ancilla_bits + syndrome_bits + scratch_bits + [flag_bit, condition_bit]
+        )
 
         c.add_barrier(data_qubits + ancilla_qubits)
         # Ft |+> state preparation with repeat until success.
@@ -547,109 +413,127 @@ class RzPartFt(RzEncoding):
         )
 
         # Gate teleportation
-        c.append(get_CX(data_qubits, ancilla_qubits))
+        _add_CX(c, data_qubits, ancilla_qubits)
         # Ft Measure
         for q, b in zip(ancilla_qubits, ancilla_bits):
             c.Measure(q, b)
 
         # Write parity to syndrome_bits[3]
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[0], ancilla_bits[1], scratch_bits[0]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[2], scratch_bits[0], scratch_bits[1]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[3], scratch_bits[1], scratch_bits[2]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[4], scratch_bits[2], scratch_bits[3]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[5], scratch_bits[3], scratch_bits[4]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [ancilla_bits[6], scratch_bits[4], syndrome_bits[3]],
         )
 
-        c.append(classical_steane_decoding(ancilla_bits, syndrome_bits[:3]))
+        _add_classical_steane_decoding(c, ancilla_bits, syndrome_bits[:3])
 
         # Check error
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitOr, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_OR,
             [syndrome_bits[0], syndrome_bits[1], scratch_bits[0]],
         )
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitOr, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_OR,
             [syndrome_bits[2], scratch_bits[0], syndrome_bits[0]],
         )
 
         # write error to condition bit
         c.add_clexpr(
-            WiredClExpr(
-                expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-                bit_posn={i: i for i in range(2)},
-                output_posn=[2],
-            ),
+            BIT_XOR,
             [syndrome_bits[0], syndrome_bits[3], condition_bit],
         )
         return c
 
 
+# The same few angles are resolved for every Rz in a circuit, so cache on the exact
+# phase: rounding the key would move phases across a truncation boundary.
+@lru_cache(maxsize=4096)
+def _resolve_phase(phase: float, max_bits: int) -> Tuple[bool, ...]:
+    # bit i is worth 2**-i, so the expansion is phase % 2 truncated to a multiple
+    # of 2**(1 - max_bits): scale it to an int (exact, as the scale is a power of
+    # two) and read off the bits. phase % 2 can round up to 2.0, which saturates.
+    scaled: int = min(int((phase % 2) * 2 ** (max_bits - 1)), (1 << max_bits) - 1)
+    return tuple(bool(scaled >> (max_bits - 1 - i) & 1) for i in range(max_bits))
+
+
+# Trimmed expansions that are a logical Clifford (up to a global phase), which ends
+# the chain of Rz gadgets. These are exactly the expansions of at most two bits.
+_CLIFFORD_TAILS: Dict[Tuple[bool, ...], Callable[[List[Qubit]], Circuit] | None] = {
+    # => I
+    (): None,
+    # => Z
+    (True,): get_Z,
+    # => S
+    (False, True): get_S,
+    # => Sdg
+    (True, True): get_Sdg,
+}
+
+
 class RzKNonFt(RzEncoding):
     def __init__(self, _max_bits: int):
         self.max_bits_ = _max_bits
 
     def resolve_phase(phase: float, max_bits: int) -> List[bool]:
-        phase_: float = phase % 2
-        binary_expansion: List[bool] = [False for _ in range(max_bits)]
-        atol = 2**-max_bits
-        for i in range(max_bits):
-            val: float = 2**-i
-            if phase_ >= val:
-                binary_expansion[i] = True
-                phase_ -= val
-            if phase_ < atol:
-                break
-        return binary_expansion
+        # a fresh list, callers trim it in place
+        return list(_resolve_phase(phase, max_bits))
+
+    def _add_gadgets(
+        self,
+        c: Circuit,
+        phase: float,
+        data_qubits: List[Qubit],
+        condition_bit: Bit,
+        gadget_bits: List[Bit],
+        get_gadget: Callable[[float], Circuit],
+    ) -> None:
+        # Each gadget is conditioned on the measurement of the previous one, and
+        # leaves the phase less its leading bit, doubled, still to apply. This goes
+        # on until that phase is a Clifford, so the k-th gadget gets the expansion
+        # from bit k on.
+        binary_expansion: List[bool] = RzKNonFt.resolve_phase(phase, self.max_bits_)
+        # skim binary expansion to remove last n zero terms
+        while binary_expansion and not binary_expansion[-1]:
+            binary_expansion.pop()
+        n_gadgets: int = max(len(binary_expansion) - 2, 0)
+        if n_gadgets:
+            add_bits(c, gadget_bits)
+        # the head gadget takes the phase as given, the rest the truncated expansion
+        phase_i: float = phase
+        remaining: float = sum(
+            [float(kval) * 2**-i for i, kval in enumerate(binary_expansion)]
+        )
+        for kval in binary_expansion[:n_gadgets]:
+            gadget: Circuit = get_gadget(phase_i)
+            c.add_circbox(
+                CircBox(gadget), gadget.qubits + gadget.bits, condition=condition_bit
+            )
+            remaining = (remaining - kval) * 2
+            phase_i = remaining
+
+        get_clifford = _CLIFFORD_TAILS[tuple(binary_expansion[n_gadgets:])]
+        if get_clifford is not None:
+            clifford: Circuit = get_clifford(data_qubits)
+            c.add_circbox(CircBox(clifford), clifford.qubits, condition=condition_bit)
 
     def get_circuit(
         self,
@@ -663,66 +547,21 @@ class RzKNonFt(RzEncoding):
         assert len(data_qubits) == 7
         assert len(ancilla_qubits) == 7
         assert len(ancilla_bits) == 7
-        #  we require recursion as we classically condition all added phase gates on the measurement of the previous step
-        binary_expansion: List[Bit] = RzKNonFt.resolve_phase(phase, self.max_bits_)
-        # skim binary expansion to remove last n zero terms
-        while binary_expansion[-1] == False:
-            assert binary_expansion.pop() == False
 
         c = Circuit()
-        for q in data_qubits + ancilla_qubits:
-            c.add_qubit(q)
-        for b in ancilla_bits + [condition_bit]:
-            c.add_bit(b)
+        add_qubits(c, data_qubits + ancilla_qubits)
+        add_bits(c, ancilla_bits + [condition_bit])
         if head:
             c.add_c_setbits([True], [condition_bit])
 
-        match binary_expansion:
-            # => I
-            case ():
-                return c
-            # => Z
-            case (1,):
-                c.add_circbox(
-                    CircBox(get_Z(data_qubits)), data_qubits, condition=condition_bit
-                )
-                return c
-            # => S
-            case (0, 1):
-                c.add_circbox(
-                    CircBox(get_S(data_qubits)), data_qubits, condition=condition_bit
-                )
-                return c
-            # => Sdg
-            case (1, 1):
-                c.add_circbox(
-                    CircBox(get_Sdg(data_qubits)), data_qubits, condition=condition_bit
-                )
-                return c
-
-        internal_circ: Circuit = RzNonFt.get_circuit(
-            phase, data_qubits, ancilla_qubits, ancilla_bits, condition_bit
-        )
-        c.add_circbox(
-            CircBox(
-                internal_circ,
-            ),
-            internal_circ.qubits + internal_circ.bits,
-            condition=condition_bit,
-        )
-
-        # recursion
-        updated_phase: float = sum(
-            [float(kval) * 2**-i for i, kval in enumerate(binary_expansion[1:])]
-        )
-        c.append(
-            self.get_circuit(
-                updated_phase,
-                data_qubits,
-                ancilla_qubits,
-                ancilla_bits,
-                condition_bit,
-                head=False,
+        self._add_gadgets(
+            c,
+            phase,
+            data_qubits,
+            condition_bit,
+            [],
+            lambda phase_i: RzNonFt.get_circuit(
+                phase_i, data_qubits, ancilla_qubits, ancilla_bits, condition_bit
             ),
         )
         return c
@@ -746,73 +585,27 @@ class RzKMeasFt(RzKNonFt):
         assert len(ancilla_qubits) == 7
         assert len(ancilla_bits) == 7
         assert len(syndrome_bits) == 3
-        #  we require recursion as we classically condition all added phase gates on the measurement of the previous step
-        binary_expansion: List[Bit] = RzKNonFt.resolve_phase(phase, self.max_bits_)
-        # skim binary expansion to remove last n zero terms
-        while binary_expansion[-1] == False:
-            assert binary_expansion.pop() == False
 
         c = Circuit()
-        for q in data_qubits + ancilla_qubits:
-            c.add_qubit(q)
-        for b in ancilla_bits + syndrome_bits + [condition_bit]:
-            c.add_bit(b)
+        add_qubits(c, data_qubits + ancilla_qubits)
+        add_bits(c, ancilla_bits + syndrome_bits + [condition_bit])
         if head:
             c.add_c_setbits([True], [condition_bit])
 
-        match binary_expansion:
-            # => I
-            case ():
-                return c
-            # => Z
-            case (1,):
-                c.add_circbox(
-                    CircBox(get_Z(data_qubits)), data_qubits, condition=condition_bit
-                )
-                return c
-            # => S
-            case (0, 1):
-                c.add_circbox(
-                    CircBox(get_S(data_qubits)), data_qubits, condition=condition_bit
-                )
-                return c
-            # => Sdg
-            case (1, 1):
-                c.add_circbox(
-                    CircBox(get_Sdg(data_qubits)), data_qubits, condition=condition_bit
-                )
-                return c
-
-        rz_meas_c: Circuit = RzMeasFt().get_circuit(
+        self._add_gadgets(
+            c,
             phase,
             data_qubits,
-            ancilla_qubits,
-            ancilla_bits,
-            syndrome_bits,
             condition_bit,
-        )
-        for b in [Bit("scratch", i) for i in range(6)]:
-            c.add_bit(b)
-
-        c.add_circbox(
-            CircBox(rz_meas_c),
-            rz_meas_c.qubits + rz_meas_c.bits,
-            condition=condition_bit,
-        )
-
-        updated_phase: float = sum(
-            [float(kval) * 2**-i for i, kval in enumerate(binary_expansion[1:])]
-        )
-        c.append(
-            RzKMeasFt(self.max_bits_).get_circuit(
-                updated_phase,
+            [Bit("scratch", i) for i in range(6)],
+            lambda phase_i: RzMeasFt().get_circuit(
+                phase_i,
                 data_qubits,
                 ancilla_qubits,
                 ancilla_bits,
                 syndrome_bits,
                 condition_bit,
-                False,
-            )
+            ),
         )
         return c
 
@@ -839,70 +632,24 @@ class RzKPartFt(RzKNonFt):
         assert len(ancilla_bits) == 7
         assert len(prep_qubits) == 2
         assert len(syndrome_bits) == 5
-        #  we require recursion as we classically condition all added phase gates on the measurement of the previous step
-        binary_expansion: List[Bit] = RzKNonFt.resolve_phase(phase, self.max_bits_)
-        # skim binary expansion to remove last n zero terms
-        while binary_expansion[-1] == False:
-            assert binary_expansion.pop() == False
 
         c = Circuit()
-        for q in data_qubits + ancilla_qubits + prep_qubits:
-            c.add_qubit(q)
-        for b in (
-            ancilla_bits + syndrome_bits + [flag_bit, condition_bit, Bit("dummy", 0)]
-        ):
-            c.add_bit(b)
+        add_qubits(c, data_qubits + ancilla_qubits + prep_qubits)
+        add_bits(
+            c, ancilla_bits + syndrome_bits + [flag_bit, condition_bit, Bit("dummy", 0)]
+        )
         if head:
             c.add_c_setbits([True], [condition_bit])
 
-        match binary_expansion:
-            # => I
-            case ():
-                return c
-            # => Z
-            case (1,):
-                c.add_circbox(
-                    CircBox(get_Z(data_qubits)), data_qubits, condition=condition_bit
-                )
-                return c
-            # => S
-            case (0, 1):
-                c.add_circbox(
-                    CircBox(get_S(data_qubits)), data_qubits, condition=condition_bit
-                )
-                return c
-            # => Sdg
-            case (1, 1):
-                c.add_circbox(
-                    CircBox(get_Sdg(data_qubits)), data_qubits, condition=condition_bit
-                )
-                return c
-
-        rz_part_c: Circuit = RzPartFt(self.max_rus_).get_circuit(
+        rz_part_ft: RzPartFt = RzPartFt(self.max_rus_)
+        self._add_gadgets(
+            c,
             phase,
             data_qubits,
-            ancilla_qubits,
-            ancilla_bits,
-            prep_qubits,
-            syndrome_bits,
-            flag_bit,
             condition_bit,
-        )
-        for b in [Bit("scratch", i) for i in range(6)]:
-            c.add_bit(b)
-
-        c.add_circbox(
-            CircBox(rz_part_c),
-            rz_part_c.qubits + rz_part_c.bits,
-            condition=condition_bit,
-        )
-
-        updated_phase: float = sum(
-            [float(kval) * 2**-i for i, kval in enumerate(binary_expansion[1:])]
-        )
-        c.append(
-            RzKPartFt(self.max_rus_, self.max_bits_).get_circuit(
-                updated_phase,
+            [Bit("scratch", i) for i in range(6)],
+            lambda phase_i: rz_part_ft.get_circuit(
+                phase_i,
                 data_qubits,
                 ancilla_qubits,
                 ancilla_bits,
@@ -910,7 +657,6 @@ class RzKPartFt(RzKNonFt):
                 syndrome_bits,
                 flag_bit,
                 condition_bit,
-                False,
-            )
+            ),
         )
         return c
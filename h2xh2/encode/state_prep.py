@@ -15,75 +15,139 @@
 from pytket.circuit import (
     Circuit,
     Bit,
+    OpType,
     Qubit,
 )
 
-from typing import List
+from typing import List, Tuple
+from functools import lru_cache
+from ._utils import add_qubits, add_resets
 
 
+# Gate tables as (op, qubit indices), indices into the 7 data qubits.
+# Steane |0> encoder.
+_NON_FT_PREP_OPS: Tuple[Tuple[OpType, Tuple[int, ...]], ...] = (
+    (OpType.H, (0,)),
+    (OpType.H, (4,)),
+    (OpType.H, (6,)),
+    (OpType.CX, (0, 1)),
+    (OpType.CX, (4, 5)),
+    (OpType.CX, (6, 3)),
+    (OpType.CX, (6, 5)),
+    (OpType.CX, (4, 2)),
+    (OpType.CX, (0, 3)),
+    (OpType.CX, (4, 1)),
+    (OpType.CX, (3, 2)),
+)
+# Steane |+> encoder: the |0> encoder conjugated by transversal H, i.e. H on the
+# complementary qubits and every CX reversed, so no trailing transversal H is needed.
+_NON_FT_PLUS_PREP_OPS: Tuple[Tuple[OpType, Tuple[int, ...]], ...] = (
+    (OpType.H, (1,)),
+    (OpType.H, (2,)),
+    (OpType.H, (3,)),
+    (OpType.H, (5,)),
+    (OpType.CX, (1, 0)),
+    (OpType.CX, (5, 4)),
+    (OpType.CX, (3, 6)),
+    (OpType.CX, (5, 6)),
+    (OpType.CX, (2, 4)),
+    (OpType.CX, (3, 0)),
+    (OpType.CX, (1, 4)),
+    (OpType.CX, (2, 3)),
+)
+# Goto check of the logical Z onto the goto qubit (index 7).
+_FT_PREP_CHECK_OPS: Tuple[Tuple[OpType, Tuple[int, ...]], ...] = (
+    (OpType.CX, (1, 7)),
+    (OpType.CX, (3, 7)),
+    (OpType.CX, (5, 7)),
+)
+
+
+def _add_ops(
+    c: Circuit,
+    ops: Tuple[Tuple[OpType, Tuple[int, ...]], ...],
+    qubits: Tuple[Qubit, ...],
+) -> None:
+    for op, indices in ops:
+        c.add_gate(op, [qubits[i] for i in indices])
+
+
+def _ops_circuit(
+    ops: Tuple[Tuple[OpType, Tuple[int, ...]], ...], n_qubits: int
+) -> Circuit:
+    c: Circuit = Circuit(n_qubits)
+    _add_ops(c, ops, tuple(c.qubits))
+    return c
+
+
+# Encoders built once on prototype qubits q[0..6], stitched onto the data
+# qubits with add_circuit rather than re-emitted gate by gate.
+_STEANE_ENCODER: Circuit = _ops_circuit(_NON_FT_PREP_OPS, 7)
+_STEANE_PLUS_ENCODER: Circuit = _ops_circuit(_NON_FT_PLUS_PREP_OPS, 7)
+
+
+def _add_reset_qubits(c: Circuit, qubits: Tuple[Qubit, ...]) -> None:
+    add_qubits(c, qubits)
+    add_resets(c, qubits)
+
+
+# Prep circuits are rebuilt for every correction/Rz gadget on the same registers,
+# so we build each one once per register and hand out copies.
+# The public getters return a copy the caller owns. The cached _get_* builders
+# return a shared instance: callers inside the package that only append it to
+# another circuit use them directly, anything that mutates must copy first.
 def get_non_ft_prep(data_qubits: List[Qubit]) -> Circuit:
+    return _get_non_ft_prep(tuple(data_qubits)).copy()
+
+
+@lru_cache(maxsize=128)
+def _get_non_ft_prep(data_qubits: Tuple[Qubit, ...]) -> Circuit:
     non_ft_prep_circ: Circuit = Circuit()
-    for q in data_qubits:
-        non_ft_prep_circ.add_qubit(q)
-        non_ft_prep_circ.Reset(q)
-    non_ft_prep_circ.H(data_qubits[0]).H(data_qubits[4]).H(data_qubits[6])
-    non_ft_prep_circ.CX(data_qubits[0], data_qubits[1]).CX(
-        data_qubits[4], data_qubits[5]
-    ).CX(data_qubits[6], data_qubits[3]).CX(data_qubits[6], data_qubits[5]).CX(
-        data_qubits[4], data_qubits[2]
-    ).CX(
-        data_qubits[0], data_qubits[3]
-    ).CX(
-        data_qubits[4], data_qubits[1]
-    ).CX(
-        data_qubits[3], data_qubits[2]
-    )
+    _add_reset_qubits(non_ft_prep_circ, data_qubits)
+    non_ft_prep_circ.add_circuit(_STEANE_ENCODER, list(data_qubits))
     return non_ft_prep_circ
 
 
+def get_non_ft_plus_prep(data_qubits: List[Qubit]) -> Circuit:
+    return _get_non_ft_plus_prep(tuple(data_qubits)).copy()
+
+
+@lru_cache(maxsize=128)
+def _get_non_ft_plus_prep(data_qubits: Tuple[Qubit, ...]) -> Circuit:
+    non_ft_plus_prep_circ: Circuit = Circuit()
+    _add_reset_qubits(non_ft_plus_prep_circ, data_qubits)
+    non_ft_plus_prep_circ.add_circuit(_STEANE_PLUS_ENCODER, list(data_qubits))
+    return non_ft_plus_prep_circ
+
+
 def get_non_ft_rz_plus_prep(phase: float, data_qubits: List[Qubit]) -> Circuit:
+    qubits: Tuple[Qubit, ...] = tuple(data_qubits)
     non_ft_rz_plus_prep_circ: Circuit = Circuit()
-    for q in data_qubits:
-        non_ft_rz_plus_prep_circ.add_qubit(q)
-        non_ft_rz_plus_prep_circ.Reset(q)
-
-    non_ft_rz_plus_prep_circ.H(data_qubits[0]).H(data_qubits[4]).H(data_qubits[6])
-    non_ft_rz_plus_prep_circ.CX(data_qubits[0], data_qubits[1])
-    non_ft_rz_plus_prep_circ.CX(data_qubits[4], data_qubits[5])
-    non_ft_rz_plus_prep_circ.CX(data_qubits[6], data_qubits[3])
-    non_ft_rz_plus_prep_circ.CX(data_qubits[6], data_qubits[5])
-    non_ft_rz_plus_prep_circ.CX(data_qubits[4], data_qubits[2])
-    non_ft_rz_plus_prep_circ.CX(data_qubits[0], data_qubits[3])
-    non_ft_rz_plus_prep_circ.CX(data_qubits[4], data_qubits[1])
-    non_ft_rz_plus_prep_circ.XXPhase(phase, data_qubits[3], data_qubits[4])
-    non_ft_rz_plus_prep_circ.CX(data_qubits[3], data_qubits[2])
-    for q in data_qubits:
-        non_ft_rz_plus_prep_circ.H(q)
+    _add_reset_qubits(non_ft_rz_plus_prep_circ, qubits)
+
+    # |+> encoder with the Rz (ZZPhase, the XXPhase of the |0> encoder conjugated
+    # by transversal H) applied before its last CX
+    _add_ops(non_ft_rz_plus_prep_circ, _NON_FT_PLUS_PREP_OPS[:-1], qubits)
+    non_ft_rz_plus_prep_circ.ZZPhase(phase, qubits[3], qubits[4])
+    _add_ops(non_ft_rz_plus_prep_circ, _NON_FT_PLUS_PREP_OPS[-1:], qubits)
     return non_ft_rz_plus_prep_circ
 
 
 def get_ft_prep(data_qubits: List[Qubit], goto_qubit: Qubit, goto_bit: Bit) -> Circuit:
+    return _get_ft_prep(tuple(data_qubits), goto_qubit, goto_bit).copy()
+
+
+@lru_cache(maxsize=128)
+def _get_ft_prep(
+    data_qubits: Tuple[Qubit, ...], goto_qubit: Qubit, goto_bit: Bit
+) -> Circuit:
+    qubits: Tuple[Qubit, ...] = data_qubits + (goto_qubit,)
     ft_prep_circ: Circuit = Circuit()
-    for q in data_qubits + [goto_qubit]:
-        ft_prep_circ.add_qubit(q)
-        ft_prep_circ.Reset(q)
+    _add_reset_qubits(ft_prep_circ, qubits)
     ft_prep_circ.add_bit(goto_bit)
 
-    ft_prep_circ.H(data_qubits[0]).H(data_qubits[4]).H(data_qubits[6])
-    ft_prep_circ.CX(data_qubits[0], data_qubits[1]).CX(
-        data_qubits[4], data_qubits[5]
-    ).CX(data_qubits[6], data_qubits[3]).CX(data_qubits[6], data_qubits[5]).CX(
-        data_qubits[4], data_qubits[2]
-    ).CX(
-        data_qubits[0], data_qubits[3]
-    ).CX(
-        data_qubits[4], data_qubits[1]
-    ).CX(
-        data_qubits[3], data_qubits[2]
-    )
+    ft_prep_circ.add_circuit(_STEANE_ENCODER, list(data_qubits))
     ft_prep_circ.add_barrier([data_qubits[1], data_qubits[3], data_qubits[5]])
-    ft_prep_circ.CX(data_qubits[1], goto_qubit).CX(data_qubits[3], goto_qubit).CX(
-        data_qubits[5], goto_qubit
-    )
+    _add_ops(ft_prep_circ, _FT_PREP_CHECK_OPS, qubits)
     ft_prep_circ.Measure(goto_qubit, goto_bit)
     return ft_prep_circ
@@ -13,100 +13,94 @@
 # limitations under the License.
 
 from pytket import Qubit, Bit, Circuit
-from pytket.circuit import ClBitVar, ClExpr, ClOp, WiredClExpr, CircBox
+from pytket.circuit import ClBitVar, ClExpr, ClOp, WiredClExpr, CircBox, OpType
 from pytket.passes import DecomposeBoxes
-from typing import Dict, List, Tuple
-from .state_prep import get_non_ft_prep, get_ft_prep
-from .basic_gates import get_H, get_CX, get_Measure
+from typing import Dict, List, Sequence, Tuple
+from .state_prep import _get_non_ft_prep, _get_non_ft_plus_prep, _get_ft_prep
+from .basic_gates import _add_transversal, _add_CX, _add_Measure
+from ._utils import STABILIZER_SUPPORTS, add_qubits, add_bits
 from itertools import product
+from functools import lru_cache
+import numpy as np
 
 
+# ((a0 | a1) | (a2 | a3)) | ((a4 | a5) | a6), binary ops only
+_ANY_NONZERO: WiredClExpr = WiredClExpr(
+    expr=ClExpr(
+        op=ClOp.BitOr,
+        args=[
+            ClExpr(
+                op=ClOp.BitOr,
+                args=[
+                    ClExpr(op=ClOp.BitOr, args=[ClBitVar(0), ClBitVar(1)]),
+                    ClExpr(op=ClOp.BitOr, args=[ClBitVar(2), ClBitVar(3)]),
+                ],
+            ),
+            ClExpr(
+                op=ClOp.BitOr,
+                args=[
+                    ClExpr(op=ClOp.BitOr, args=[ClBitVar(4), ClBitVar(5)]),
+                    ClBitVar(6),
+                ],
+            ),
+        ],
+    ),
+    bit_posn={i: i for i in range(7)},
+    output_posn=[7],
+)
+
+
+# each syndrome bit is the parity of four ancilla bits, written as one
+# expression tree: (a ^ b) ^ (c ^ d)
+_PARITY_4: WiredClExpr = WiredClExpr(
+    expr=ClExpr(
+        op=ClOp.BitXor,
+        args=[
+            ClExpr(op=ClOp.BitXor, args=[ClBitVar(0), ClBitVar(1)]),
+            ClExpr(op=ClOp.BitXor, args=[ClBitVar(2), ClBitVar(3)]),
+        ],
+    ),
+    bit_posn={i: i for i in range(4)},
+    output_posn=[4],
+)
+
+
+# guard_bit: if given, set to the OR of the ancilla bits and the syndrome is only
+# computed when it is set. An all zero readout has the trivial syndrome, so the
+# syndrome bits are cleared first and read as zero when the parities are skipped.
 def classical_steane_decoding(
     ancilla_bits: List[Bit],
     syndrome_bits: List[Bit],
+    guard_bit: Bit | None = None,
 ) -> Circuit:
+    c: Circuit = Circuit()
+    add_bits(c, [*ancilla_bits, *syndrome_bits])
+    if guard_bit is not None:
+        c.add_bit(guard_bit)
+    _add_classical_steane_decoding(c, ancilla_bits, syndrome_bits, guard_bit)
+    return c
+
+
+# adds the decoding straight onto c, whose bits must include these (and guard_bit)
+def _add_classical_steane_decoding(
+    c: Circuit,
+    ancilla_bits: Sequence[Bit],
+    syndrome_bits: Sequence[Bit],
+    guard_bit: Bit | None = None,
+) -> None:
     assert len(ancilla_bits) == 7
     assert len(syndrome_bits) == 3
-    c: Circuit = Circuit()
-    scratch_bits: List[Bit] = [Bit("scratch", i) for i in range(2)]
-    for b in ancilla_bits + syndrome_bits + scratch_bits:
-        c.add_bit(b)
-
-    c.add_clexpr(
-        WiredClExpr(
-            expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-            bit_posn={i: i for i in range(2)},
-            output_posn=[2],
-        ),
-        [ancilla_bits[0], ancilla_bits[1], scratch_bits[0]],
-    )
-    c.add_clexpr(
-        WiredClExpr(
-            expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-            bit_posn={i: i for i in range(2)},
-            output_posn=[2],
-        ),
-        [ancilla_bits[2], scratch_bits[0], scratch_bits[1]],
-    )
-    c.add_clexpr(
-        WiredClExpr(
-            expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-            bit_posn={i: i for i in range(2)},
-            output_posn=[2],
-        ),
-        [ancilla_bits[3], scratch_bits[1], syndrome_bits[0]],
-    )
 
-    c.add_clexpr(
-        WiredClExpr(
-            expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-            bit_posn={i: i for i in range(2)},
-            output_posn=[2],
-        ),
-        [ancilla_bits[1], ancilla_bits[2], scratch_bits[0]],
-    )
-    c.add_clexpr(
-        WiredClExpr(
-            expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-            bit_posn={i: i for i in range(2)},
-            output_posn=[2],
-        ),
-        [ancilla_bits[4], scratch_bits[0], scratch_bits[1]],
-    )
-    c.add_clexpr(
-        WiredClExpr(
-            expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-            bit_posn={i: i for i in range(2)},
-            output_posn=[2],
-        ),
-        [ancilla_bits[5], scratch_bits[1], syndrome_bits[1]],
-    )
+    condition: Dict[str, List[Bit] | int] = {}
+    if guard_bit is not None:
+        c.add_clexpr(_ANY_NONZERO, [*ancilla_bits, guard_bit])
+        c.add_c_setbits([False] * len(syndrome_bits), list(syndrome_bits))
+        condition = {"condition_bits": [guard_bit], "condition_value": 1}
 
-    c.add_clexpr(
-        WiredClExpr(
-            expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-            bit_posn={i: i for i in range(2)},
-            output_posn=[2],
-        ),
-        [ancilla_bits[2], ancilla_bits[3], scratch_bits[0]],
-    )
-    c.add_clexpr(
-        WiredClExpr(
-            expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-            bit_posn={i: i for i in range(2)},
-            output_posn=[2],
-        ),
-        [ancilla_bits[5], scratch_bits[0], scratch_bits[1]],
-    )
-    c.add_clexpr(
-        WiredClExpr(
-            expr=ClExpr(op=ClOp.BitXor, args=[ClBitVar(i) for i in range(2)]),
-            bit_posn={i: i for i in range(2)},
-            output_posn=[2],
-        ),
-        [ancilla_bits[6], scratch_bits[1], syndrome_bits[2]],
-    )
-    return c
+    for syndrome_bit, indices in zip(syndrome_bits, STABILIZER_SUPPORTS):
+        c.add_clexpr(
+            _PARITY_4, [ancilla_bits[i] for i in indices] + [syndrome_bit], **condition
+        )
 
 
 steane_lookup_table: Dict[Tuple[bool, bool, bool], int] = {
@@ -119,8 +113,60 @@ steane_lookup_table: Dict[Tuple[bool, bool, bool], int] = {
     (1, 0, 0): 6,
 }
 
+# Non-trivial syndromes paired with the data qubit index they flip.
+_NONZERO_SYNDROMES: Tuple[Tuple[Tuple[int, int, int], int], ...] = tuple(
+    (s, steane_lookup_table[s[::-1]])
+    for s in product((0, 1), repeat=3)
+    if s != (0, 0, 0)
+)
+
+
+def _syndrome_match(syndrome: Tuple[int, int, int]) -> WiredClExpr:
+    # output bit is set iff the three syndrome bits equal `syndrome`
+    terms: List[ClBitVar | ClExpr] = [
+        ClBitVar(i) if b else ClExpr(op=ClOp.BitNot, args=[ClBitVar(i)])
+        for i, b in enumerate(syndrome)
+    ]
+    return WiredClExpr(
+        expr=ClExpr(
+            op=ClOp.BitAnd,
+            args=[ClExpr(op=ClOp.BitAnd, args=terms[:2]), terms[2]],
+        ),
+        bit_posn={i: i for i in range(3)},
+        output_posn=[3],
+    )
+
+
+# Syndrome match expression paired with the data qubit index to flip.
+_SYNDROME_CORRECTIONS: Tuple[Tuple[WiredClExpr, int], ...] = tuple(
+    (_syndrome_match(syndrome), flip_idx) for syndrome, flip_idx in _NONZERO_SYNDROMES
+)
+
+
+# FT prep conditioned on goto_bit, with the box decomposed once here rather than
+# decomposing every correction circuit. Shared between calls: only append it.
+@lru_cache(maxsize=128)
+def _get_conditional_ft_prep(
+    ancilla_qubits: Tuple[Qubit, ...], goto_qubit: Qubit, goto_bit: Bit
+) -> Circuit:
+    ft_prep_circ: Circuit = _get_ft_prep(ancilla_qubits, goto_qubit, goto_bit)
+    c: Circuit = Circuit()
+    add_qubits(c, ft_prep_circ.qubits)
+    add_bits(c, ft_prep_circ.bits)
+    c.add_circbox(
+        CircBox(ft_prep_circ),
+        ft_prep_circ.qubits + ft_prep_circ.bits,
+        condition=goto_bit,
+    )
+    DecomposeBoxes().apply(c)
+    return c
+
 
-# Non-FT state prep provided if max_repeats = 0
+# Non-FT state prep provided if max_repeats = 0. If guard_bit is given, decoding and
+# correction are skipped when every ancilla bit reads zero.
+# Every cycle on a logical qubit is the same circuit, so as with the prep circuits
+# each is built once: the public functions return a copy, the cached _get_*
+# builders a shared instance that must only be appended.
 def steane_z_correction(
     data_qubits: List[Qubit],
     ancilla_qubits: List[Qubit],
@@ -130,6 +176,32 @@ def steane_z_correction(
     goto_bit: Bit,
     register_bit: Bit,
     max_repeats: int = 0,
+    guard_bit: Bit | None = None,
+) -> Circuit:
+    return _get_steane_z_correction(
+        tuple(data_qubits),
+        tuple(ancilla_qubits),
+        tuple(ancilla_bits),
+        tuple(syndrome_bits),
+        goto_qubit,
+        goto_bit,
+        register_bit,
+        max_repeats,
+        guard_bit,
+    ).copy()
+
+
+@lru_cache(maxsize=128)
+def _get_steane_z_correction(
+    data_qubits: Tuple[Qubit, ...],
+    ancilla_qubits: Tuple[Qubit, ...],
+    ancilla_bits: Tuple[Bit, ...],
+    syndrome_bits: Tuple[Bit, ...],
+    goto_qubit: Qubit,
+    goto_bit: Bit,
+    register_bit: Bit,
+    max_repeats: int,
+    guard_bit: Bit | None,
 ) -> Circuit:
     assert len(data_qubits) == 7
     assert len(ancilla_qubits) == 7
@@ -137,60 +209,57 @@ def steane_z_correction(
     assert len(syndrome_bits) == 3
 
     correction: Circuit = Circuit()
-    for q in data_qubits + ancilla_qubits + [goto_qubit]:
-        correction.add_qubit(q)
-    for b in ancilla_bits + syndrome_bits + [goto_bit, register_bit]:
-        correction.add_bit(b)
+    all_qubits: Tuple[Qubit, ...] = data_qubits + ancilla_qubits + (goto_qubit,)
+    add_qubits(correction, all_qubits)
+    add_bits(correction, ancilla_bits + syndrome_bits + (goto_bit, register_bit))
+    if guard_bit is not None:
+        correction.add_bit(guard_bit)
 
-    correction.add_barrier(data_qubits + ancilla_qubits + [goto_qubit])
+    correction.add_barrier(all_qubits)
     # FT plus state preparation.
     if max_repeats == 0:
-        # non-FT
-        correction.append(get_non_ft_prep(ancilla_qubits))
+        # non-FT, encodes |+> directly rather than |0> followed by transversal H
+        correction.append(_get_non_ft_plus_prep(ancilla_qubits))
     else:
         # FT
         assert max_repeats >= 1
         correction.add_c_setbits([True], [goto_bit])
-        ft_prep_circ: Circuit = get_ft_prep(ancilla_qubits, goto_qubit, goto_bit)
+        ft_prep_cond: Circuit = _get_conditional_ft_prep(
+            ancilla_qubits, goto_qubit, goto_bit
+        )
         for _ in range(max_repeats):
             # N.B. max_repeats == 1 => one guaranteed correction
-            correction.add_circbox(
-                CircBox(ft_prep_circ),
-                ft_prep_circ.qubits + ft_prep_circ.bits,
-                condition=goto_bit,
-            )
+            correction.append(ft_prep_cond)
 
-    DecomposeBoxes().apply(correction)
-    # Tranvsersal H
-    correction.append(get_H(ancilla_qubits))
+        # Tranvsersal H
+        _add_transversal(correction, OpType.H, ancilla_qubits)
 
     # Logical (transversal) CX
-    correction.append(get_CX(data_qubits, ancilla_qubits))
+    _add_CX(correction, data_qubits, ancilla_qubits)
 
     # Measure Ancilla qubits
-    correction.append(get_Measure(ancilla_qubits, ancilla_bits))
-
-    correction.append(classical_steane_decoding(ancilla_bits, syndrome_bits))
-
-    for syndrome in list(product(*[range(2)] * 3))[1:]:
-        assert syndrome in steane_lookup_table
-        correction.add_c_setbits([True], [register_bit])
-        for index, b in enumerate(syndrome):
-            correction.add_c_setbits(
-                [False],
-                [register_bit],
-                condition_bits=[syndrome_bits[index]],
-                condition_value=int(b) ^ 1,
-            )
+    _add_Measure(correction, ancilla_qubits, ancilla_bits)
+
+    _add_classical_steane_decoding(correction, ancilla_bits, syndrome_bits, guard_bit)
+
+    condition: Dict[str, List[Bit] | int] = {}
+    if guard_bit is not None:
+        # register_bit is cleared so the flips below are no-ops when the guarded
+        # matches are skipped
+        correction.add_c_setbits([False], [register_bit])
+        condition = {"condition_bits": [guard_bit], "condition_value": 1}
+    for match, flip_idx in _SYNDROME_CORRECTIONS:
+        correction.add_clexpr(match, syndrome_bits + (register_bit,), **condition)
         correction.X(
-            data_qubits[steane_lookup_table[syndrome[::-1]]],
+            data_qubits[flip_idx],
             condition_bits=[register_bit],
             condition_value=1,
         )
     return correction
 
 
-# Non-FT state prep provided if max_repeats = 0
+# Non-FT state prep provided if max_repeats = 0. If guard_bit is given, decoding and
+# correction are skipped when every ancilla bit reads zero.
 def steane_x_correction(
     data_qubits: List[Qubit],
     ancilla_qubits: List[Qubit],
@@ -200,6 +269,32 @@ def steane_x_correction(
     goto_bit: Bit,
     register_bit: Bit,
     max_repeats: int = 0,
+    guard_bit: Bit | None = None,
+) -> Circuit:
+    return _get_steane_x_correction(
+        tuple(data_qubits),
+        tuple(ancilla_qubits),
+        tuple(ancilla_bits),
+        tuple(syndrome_bits),
+        goto_qubit,
+        goto_bit,
+        register_bit,
+        max_repeats,
+        guard_bit,
+    ).copy()
+
+
+@lru_cache(maxsize=128)
+def _get_steane_x_correction(
+    data_qubits: Tuple[Qubit, ...],
+    ancilla_qubits: Tuple[Qubit, ...],
+    ancilla_bits: Tuple[Bit, ...],
+    syndrome_bits: Tuple[Bit, ...],
+    goto_qubit: Qubit,
+    goto_bit: Bit,
+    register_bit: Bit,
+    max_repeats: int,
+    guard_bit: Bit | None,
 ) -> Circuit:
     assert len(data_qubits) == 7
     assert len(ancilla_qubits) == 7
@@ -207,54 +302,48 @@ def steane_x_correction(
     assert len(syndrome_bits) == 3
 
     correction: Circuit = Circuit()
-    for q in data_qubits + ancilla_qubits + [goto_qubit]:
-        correction.add_qubit(q)
-    for b in ancilla_bits + syndrome_bits + [goto_bit, register_bit]:
-        correction.add_bit(b)
+    all_qubits: Tuple[Qubit, ...] = data_qubits + ancilla_qubits + (goto_qubit,)
+    add_qubits(correction, all_qubits)
+    add_bits(correction, ancilla_bits + syndrome_bits + (goto_bit, register_bit))
+    if guard_bit is not None:
+        correction.add_bit(guard_bit)
 
-    correction.add_barrier(data_qubits + ancilla_qubits + [goto_qubit])
+    correction.add_barrier(all_qubits)
     # FT 0 state preparation.
     if max_repeats == 0:
         # non-FT
-        correction.append(get_non_ft_prep(ancilla_qubits))
+        correction.append(_get_non_ft_prep(ancilla_qubits))
     else:
         # FT
         assert max_repeats >= 1
         correction.add_c_setbits([True], [goto_bit])
-        ft_prep_circ: Circuit = get_ft_prep(ancilla_qubits, goto_qubit, goto_bit)
+        ft_prep_cond: Circuit = _get_conditional_ft_prep(
+            ancilla_qubits, goto_qubit, goto_bit
+        )
         for _ in range(max_repeats):
             # N.B. max_repeats == 1 => one guaranteed correction
+            correction.append(ft_prep_cond)
 
-            correction.add_circbox(
-                CircBox(ft_prep_circ),
-                ft_prep_circ.qubits + ft_prep_circ.bits,
-                condition=goto_bit,
-            )
-
-    DecomposeBoxes().apply(correction)
     # Logical (transversal) CX
-    correction.append(get_CX(ancilla_qubits, data_qubits))
+    _add_CX(correction, ancilla_qubits, data_qubits)
     # Logical (tranversal) H
-    correction.append(get_H(ancilla_qubits))
+    _add_transversal(correction, OpType.H, ancilla_qubits)
 
     # Measure Ancilla qubits
-    for q, b in zip(ancilla_qubits, ancilla_bits):
-        correction.Measure(q, b)
-
-    correction.append(classical_steane_decoding(ancilla_bits, syndrome_bits))
-
-    for syndrome in list(product(*[range(2)] * 3))[1:]:
-        assert syndrome in steane_lookup_table
-        correction.add_c_setbits([True], [register_bit])
-        for index, b in enumerate(syndrome):
-            correction.add_c_setbits(
-                [False],
-                [register_bit],
-                condition_bits=[syndrome_bits[index]],
-                condition_value=int(b) ^ 1,
-            )
+    _add_Measure(correction, ancilla_qubits, ancilla_bits)
+
+    _add_classical_steane_decoding(correction, ancilla_bits, syndrome_bits, guard_bit)
+
+    condition: Dict[str, List[Bit] | int] = {}
+    if guard_bit is not None:
+        # register_bit is cleared so the flips below are no-ops when the guarded
+        # matches are skipped
+        correction.add_c_setbits([False], [register_bit])
+        condition = {"condition_bits": [guard_bit], "condition_value": 1}
+    for match, flip_idx in _SYNDROME_CORRECTIONS:
+        correction.add_clexpr(match, syndrome_bits + (register_bit,), **condition)
         correction.Z(
-            data_qubits[steane_lookup_table[syndrome[::-1]]],
+            data_qubits[flip_idx],
             condition_bits=[register_bit],
             condition_value=1,
         )
@@ -262,26 +351,89 @@ def steane_x_correction(
     return correction
 
 
+# Readouts are packed into an int with readout[i] at bit i, so each syndrome bit
+# is the parity of the readout masked by the matching stabilizer.
+_PARITY_MASKS: Tuple[int, int, int] = (0b0001111, 0b0110110, 0b1101100)
+# Packed syndrome (syndrome[i] at bit i) -> index of the bit to flip.
+_FLIP_FROM_SYNDROME: Dict[int, int] = {
+    s[2] | s[1] << 1 | s[0] << 2: flip for s, flip in steane_lookup_table.items()
+}
+
+
+# Packed readout -> readout tuple, shared so unpacking allocates nothing.
+_UNPACKED_READOUTS: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple((packed >> i) & 1 for i in range(7)) for packed in range(1 << 7)
+)
+
+
+def _pack_readout(readout: Tuple[int, ...]) -> int:
+    packed: int = 0
+    for i, b in enumerate(readout):
+        packed |= int(b) << i
+    return packed
+
+
+def _packed_syndrome(packed: int) -> int:
+    syndrome: int = 0
+    for i, mask in enumerate(_PARITY_MASKS):
+        syndrome |= ((packed & mask).bit_count() & 1) << i
+    return syndrome
+
+
+def _corrected_packed(packed: int) -> int:
+    syndrome: int = _packed_syndrome(packed)
+    if syndrome:
+        packed ^= 1 << _FLIP_FROM_SYNDROME[syndrome]
+    return packed
+
+
+# Packed readout -> packed corrected readout, so correcting is a single lookup.
+_CORRECTED: Tuple[int, ...] = tuple(_corrected_packed(p) for p in range(1 << 7))
+_CORRECTED_LUT: np.ndarray = np.array(_CORRECTED, dtype=np.uint8)
+# Packed readout -> unpacked readout row, for the batched lookup.
+_UNPACKED_LUT: np.ndarray = np.array(_UNPACKED_READOUTS, dtype=np.uint8)
+_PACK_WEIGHTS: np.ndarray = 1 << np.arange(7, dtype=np.uint8)
+
+
 def syndrome_from_readout(
     readout: Tuple[int, int, int, int, int, int, int],
 ) -> Tuple[int, int, int]:
-    assert len(readout) == 7
+    # unpacking checks there are exactly seven bits
+    r0, r1, r2, r3, r4, r5, r6 = readout
     return (
-        sum([readout[i] for i in [0, 1, 2, 3]]) % 2,
-        sum([readout[i] for i in [1, 2, 4, 5]]) % 2,
-        sum([readout[i] for i in [2, 3, 5, 6]]) % 2,
+        (r0 ^ r1 ^ r2 ^ r3) & 1,
+        (r1 ^ r2 ^ r4 ^ r5) & 1,
+        (r2 ^ r3 ^ r5 ^ r6) & 1,
     )
 
 
 def readout_correction(
     readout: Tuple[int, int, int, int, int, int, int],
 ) -> Tuple[int, int, int, int, int, int, int]:
-    # n.b. this does not edit the input readout, instead copying and editing a new object
-    readout_copy: List[int] = list(readout)[:]
-    syndrome: Tuple[int, int, int] = syndrome_from_readout(readout_copy)
-    if syndrome == (0, 0, 0):
-        return tuple(readout_copy)
-    assert syndrome in steane_lookup_table
-    flip: int = steane_lookup_table[syndrome[::-1]]
-    readout_copy[flip] = int(not readout_copy[flip])
-    return tuple(readout_copy)
+    # n.b. this does not edit the input readout, a new tuple is returned
+    assert len(readout) == 7
+    return _UNPACKED_READOUTS[_CORRECTED[_pack_readout(readout)]]
+
+
+# Steane parity-check matrix, one stabilizer per row.
+_H_STEANE: np.ndarray = np.array(
+    [
+        [1, 1, 1, 1, 0, 0, 0],
+        [0, 1, 1, 0, 1, 1, 0],
+        [0, 0, 1, 1, 0, 1, 1],
+    ],
+    dtype=np.uint8,
+)
+
+
+# Same as syndrome_from_readout applied to every row of an (N, 7) array of readouts.
+def syndromes_from_readouts(readouts: np.ndarray) -> np.ndarray:
+    return (np.asarray(readouts, dtype=np.uint8).reshape(-1, 7) @ _H_STEANE.T) & 1
+
+
+# Same as readout_correction applied to every row of an (N, 7) array of readouts.
+def readout_correction_batch(readouts: np.ndarray) -> np.ndarray:
+    packed: np.ndarray = (
+        np.asarray(readouts, dtype=np.uint8).reshape(-1, 7) @ _PACK_WEIGHTS
+    )
+    return _UNPACKED_LUT[_CORRECTED_LUT[packed]]
@@ -32,6 +32,7 @@ from ._benchmark import (
 from ._iqpe import (
     IqpeInput,
     build_encode_iqpe_circuits,
+    iter_encode_iqpe_circuits,
     build_iqpe_circuits,
     interpret_process_iqpe_results,
     process_iqpe_results,
@@ -49,5 +50,6 @@ __all__ = [
     "process_iqpe_results",
     "build_iqpe_circuits",
     "build_encode_iqpe_circuits",
+    "iter_encode_iqpe_circuits",
     "interpret_process_iqpe_results",
 ]
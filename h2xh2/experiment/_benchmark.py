@@ -16,6 +16,7 @@ from typing import (
     Callable,
     NamedTuple,
 )
+from functools import lru_cache
 from pytket.circuit import Circuit
 from pytket.passes import RemoveBarriers
 from pytket.backends.backendresult import BackendResult
@@ -23,6 +24,7 @@ from h2xh2.encode import EncodeOptions, InterpretOptions
 from ._chemistry import (
     get_state,
     get_ctrl_func,
+    get_ctrlu_phase,
 )
 from ..algorithm import get_qpe_func
 
@@ -43,11 +45,11 @@ class BenchmarkResult(NamedTuple):
     n_shots: list[int]
 
 
-def build_benchmark_circuits(
-    k_list: list[int],
+@lru_cache(maxsize=8)
+def _get_benchmark_func(
     pft_rz: bool,
     qec_level: int,
-) -> list[Circuit]:
+) -> Callable[[int, float], Circuit]:
     state = get_state(
         benchmark=True,
         pft_rz=pft_rz,
@@ -56,14 +58,31 @@ def build_benchmark_circuits(
         benchmark=True,
         pft_rz=pft_rz,
         qec_level=qec_level,
+        # The iceberg QED has to follow the ancilla Rz, so keep it in ctrl-U.
+        ancilla_phase=pft_rz,
     )
-    get_circuit = get_qpe_func(
+    return get_qpe_func(
         state,
         get_ctrlu,
     )
+
+
+# Shared between calls: copy before handing out.
+@lru_cache(maxsize=256)
+def _get_benchmark_circuit(k: int, pft_rz: bool, qec_level: int) -> Circuit:
+    # Merge the ancilla phase of ctrl-U into Rz(beta): one Rz instead of two.
+    beta = 0.0 if pft_rz else get_ctrlu_phase(k, benchmark=True)
+    return _get_benchmark_func(pft_rz, qec_level)(k, beta=beta)
+
+
+def build_benchmark_circuits(
+    k_list: list[int],
+    pft_rz: bool,
+    qec_level: int,
+) -> list[Circuit]:
     circuits: list[Circuit] = []
     for k in k_list:
-        circuits.append(get_circuit(k, beta=0.0))
+        circuits.append(_get_benchmark_circuit(k, pft_rz, qec_level).copy())
     return circuits
 
 
@@ -16,6 +16,7 @@ from typing import (
     NamedTuple,
     Callable,
 )
+from functools import lru_cache
 import numpy as np
 from pytket.circuit import (
     Circuit,
@@ -45,127 +46,154 @@ class ChemData(NamedTuple):
     DELTAT: float = _DELTAT
     APPROX_ENERGY: float = _APPROX_ENERGY
     APPROX_PHASE: float = -_APPROX_ENERGY * _DELTAT
-    ANSATZ_PARAM: float = [-0.08728706, -0.25]
+    ANSATZ_PARAM: tuple[float, float] = (-0.08728706, -0.25)
 
 
 _chem_data = ChemData()
 
 
-def resolve_phase(phase: float, max_bits: int = 10) -> list[int]:
-    phase_ = phase % 2.0
-    bits = []
-    atol = 2 ** (-max_bits)
-    phase_ += atol
-    if phase_ > 2.0:
-        return bits
-    for i in range(max_bits):
-        val = 2**-i
-        if phase_ >= val:
-            bits.append(1)
-            phase_ -= val
-        else:
-            bits.append(0)
-        if phase_ < atol:
-            break
-    return bits
-
-
-def _add_ctrlu_0(
+@lru_cache(maxsize=128)
+def resolve_phase(phase: float, max_bits: int = 10) -> tuple[int, ...]:
+    """Bits of ``phase % 2`` as a binary fraction, bit i weighing 2**-i.
+
+    The phase is rounded to the nearest multiple of 2**-(max_bits - 1).
+    """
+    # Fixed-point value in units of the last bit, rounded half up, modulo 2.
+    n = int((phase % 2.0) * (1 << (max_bits - 1)) + 0.5) % (1 << max_bits)
+    return tuple((n >> (max_bits - 1 - i)) & 1 for i in range(max_bits))
+
+
+def _fixed_point(phase: float, max_bits: int) -> float:
+    """The phase rounded as in `resolve_phase`."""
+    return sum([a * 2**-i for i, a in enumerate(resolve_phase(phase, max_bits))])
+
+
+# Round the rotation angle. This is done for the compatibility between plain and Stean.
+_ANGLE_Z: float = _fixed_point(_chem_data.CZ * _chem_data.DELTAT, _chem_data.MAX_BITS)
+_ANGLE_X: float = _fixed_point(_chem_data.CX * _chem_data.DELTAT, _chem_data.MAX_BITS)
+
+
+def _add_trotter_step(
     circ: Circuit,
-    k: int,
     angle_z: float,
     angle_x: float,
-) -> Callable[[int], Circuit]:
-    """Plain ctrl-U circuit without any QPE circuit included."""
-    for ii in range(k):
-        # circ.CRz(2 * cz * deltat, 0, 1)
-        circ.Rz(angle_z, 1)
-        circ.CX(0, 1)
-        circ.Rz(-angle_z, 1)
-        circ.CX(0, 1)
-        # circ.CRx(2 * cx * deltat, 0, 1)
-        circ.H(1)
-        circ.Rz(angle_x, 1)
-        circ.CX(0, 1)
-        circ.Rz(-angle_x, 1)
-        circ.CX(0, 1)
-        circ.H(1)
+) -> Circuit:
+    """Plain Trotter step of ctrl-U."""
+    # circ.CRz(2 * cz * deltat, 0, 1)
+    circ.Rz(angle_z, 1)
+    circ.CX(0, 1)
+    circ.Rz(-angle_z, 1)
+    circ.CX(0, 1)
+    # circ.CRx(2 * cx * deltat, 0, 1)
+    circ.H(1)
+    circ.Rz(angle_x, 1)
+    circ.CX(0, 1)
+    circ.Rz(-angle_x, 1)
+    circ.CX(0, 1)
+    circ.H(1)
     return circ
 
 
-def _add_ctrlu_1(
+def _add_trotter_step_2(
     circ: Circuit,
-    k: int,
     angle_z: float,
     angle_x: float,
-) -> Callable[[int], Circuit]:
-    """Add Steane QEC for X syndrome of the QPE ancilla qubit."""
-    for ii in range(k):
-        # circ.CRz(2 * cz * deltat, 0, 1)
-        circ.Rz(angle_z, 1)
-        circ.CX(0, 1)
-        circ.Rz(-angle_z, 1)
-        circ.CX(0, 1)
-        # circ.CRx(2 * cx * deltat, 0, 1)
-        circ.H(1)
-        circ.Rz(angle_x, 1)
-        circ.CX(0, 1)
-        circ.Rz(-angle_x, 1)
-        circ.CX(0, 1)
-        circ.H(1)
-        if ii + 1 >= k:
-            break
-        circ.add_barrier(circ.qubits)
-        circ.add_custom_gate(steane_x_correct, [], [0])
-        circ.add_barrier(circ.qubits)
+) -> Circuit:
+    """Trotter step with Steane QEC for X in the middle."""
+    qubits = circ.qubits
+    # circ.CRz(2 * cz * deltat, 0, 1)
+    circ.Rz(angle_z, 1)
+    circ.CX(0, 1)
+    circ.Rz(-angle_z, 1)
+    circ.CX(0, 1)
+    # Steane QEC for X.
+    circ.add_barrier(qubits)
+    circ.add_custom_gate(steane_x_correct, [], [0])
+    circ.add_barrier(qubits)
+    circ.add_custom_gate(steane_x_correct, [], [1])
+    circ.add_barrier(qubits)
+    # circ.CRx(2 * cx * deltat, 0, 1)
+    circ.H(1)
+    circ.Rz(angle_x, 1)
+    # Spin echo.
+    circ.CX(0, 1)
+    circ.Rz(-angle_x, 1)
+    circ.CX(0, 1)
+    # Spin echo.
+    circ.H(1)
     return circ
 
 
-def _add_ctrlu_2(
-    circ: Circuit,
-    k: int,
+def _add_qec_1(circ: Circuit) -> Circuit:
+    """Steane QEC for X syndrome of the QPE ancilla qubit."""
+    qubits = circ.qubits
+    circ.add_barrier(qubits)
+    circ.add_custom_gate(steane_x_correct, [], [0])
+    circ.add_barrier(qubits)
+    return circ
+
+
+def _add_qec_2(circ: Circuit) -> Circuit:
+    """Steane QEC for all logical qubits."""
+    qubits = circ.qubits
+    circ.add_barrier(qubits)
+    circ.add_custom_gate(steane_x_correct, [], [0])
+    circ.add_custom_gate(steane_z_correct, [], [0])
+    circ.add_barrier(qubits)
+    circ.add_custom_gate(steane_x_correct, [], [1])
+    circ.add_custom_gate(steane_z_correct, [], [1])
+    circ.add_barrier(qubits)
+    return circ
+
+
+def _get_ctrlu_blocks(
+    qec_level: int,
     angle_z: float,
     angle_x: float,
-) -> Callable[[int], Circuit]:
-    """Add Steane QEC for each Trotter step and QEC_X in the middle."""
-    for ii in range(k):
-        # circ.CRz(2 * cz * deltat, 0, 1)
-        circ.Rz(angle_z, 1)
-        circ.CX(0, 1)
-        circ.Rz(-angle_z, 1)
-        circ.CX(0, 1)
-        # Steane QEC for X.
-        circ.add_barrier(circ.qubits)
-        circ.add_custom_gate(steane_x_correct, [], [0])
-        circ.add_barrier(circ.qubits)
-        circ.add_custom_gate(steane_x_correct, [], [1])
-        circ.add_barrier(circ.qubits)
-        # circ.CRx(2 * cx * deltat, 0, 1)
-        circ.H(1)
-        circ.Rz(angle_x, 1)
-        # Spin echo.
-        circ.CX(0, 1)
-        circ.Rz(-angle_x, 1)
-        circ.CX(0, 1)
-        # Spin echo.
-        circ.H(1)
-        if ii + 1 >= k:
-            break
-        circ.add_barrier(circ.qubits)
-
-        circ.add_custom_gate(steane_x_correct, [], [0])
-        circ.add_custom_gate(steane_z_correct, [], [0])
-        circ.add_barrier(circ.qubits)
-        circ.add_custom_gate(steane_x_correct, [], [1])
-        circ.add_custom_gate(steane_z_correct, [], [1])
-        circ.add_barrier(circ.qubits)
-    return circ
+) -> tuple[Circuit, Circuit]:
+    """Trotter step of ctrl-U with and without the QEC between steps.
+
+    ctrl-U^k is the first block k - 1 times followed by the second one.
+    """
+    match qec_level:
+        case 0:
+            # Plain ctrl-U circuit without any QPE circuit included.
+            step = _add_trotter_step(Circuit(2), angle_z, angle_x)
+            return step, step
+        case 1:
+            # Add Steane QEC for X syndrome of the QPE ancilla qubit.
+            step = _add_trotter_step(Circuit(2), angle_z, angle_x)
+            return _add_qec_1(step.copy()), step
+        case 2:
+            # Add Steane QEC for each Trotter step and QEC_X in the middle.
+            step = _add_trotter_step_2(Circuit(2), angle_z, angle_x)
+            return _add_qec_2(step.copy()), step
+        case _:
+            raise ValueError("qec_level")
+
+
+def get_ctrlu_phase(k: int, benchmark: bool = False) -> float:
+    """Rz angle ctrl-U^k applies to the QPE ancilla.
+
+    Args:
+        k: Number of repeats of ctrl-U.
+        benchmark: Include Rz(-kEt) if True.
+
+    Returns:
+        The rotation angle in half turns.
+    """
+    if benchmark:
+        phase_factor = _chem_data.CI - _chem_data.APPROX_ENERGY
+    else:
+        phase_factor = _chem_data.CI
+    return -1 * k * phase_factor * _chem_data.DELTAT
 
 
 def get_ctrl_func(
     benchmark: bool = False,
     pft_rz: bool = False,
     qec_level: int = 0,
+    ancilla_phase: bool = True,
 ) -> Callable[[int], Circuit]:
     """Get a function to return a circuit representing ctrl-U.
 
@@ -173,42 +201,27 @@ def get_ctrl_func(
         benchmark: Add Rz(-kEt) if True.
         pft_rz: Add the iceberg-style QED for Rz(beta).
         qec_level: 0 -> No QEC, 1 -> QEC for QPE ancilla, 2 -> for all logical qubits.
+        ancilla_phase: Add the Rz on the QPE ancilla (see `get_ctrlu_phase`) if True.
+            It commutes with the rest of ctrl-U, so the caller may merge it into
+            the Rz(beta) instead.
 
     Returns:
         A function to return a circuit.
     """
+    # The Trotter steps are built once and appended k times by get_ctrlu.
+    step_qec, step = _get_ctrlu_blocks(qec_level, _ANGLE_Z, _ANGLE_X)
 
     def get_ctrlu(k: int) -> Circuit:
         circ = Circuit(2)
-        # Round the rotation angle. This is done for the compatibility between plain and Stean.
-        bits = resolve_phase(
-            _chem_data.CZ * _chem_data.DELTAT,
-            max_bits=_chem_data.MAX_BITS,
-        )
-        angle_z = sum([a * 2**-i for i, a in enumerate(bits)])
-        bits = resolve_phase(
-            _chem_data.CX * _chem_data.DELTAT,
-            max_bits=_chem_data.MAX_BITS,
-        )
-        angle_x = sum([a * 2**-i for i, a in enumerate(bits)])
-        match qec_level:
-            case 0:
-                _add_ctrlu_0(circ, k, angle_z, angle_x)
-            case 1:
-                _add_ctrlu_1(circ, k, angle_z, angle_x)
-            case 2:
-                _add_ctrlu_2(circ, k, angle_z, angle_x)
-            case _:
-                raise ValueError("qec_level")
-        if benchmark:
-            phase_factor = _chem_data.CI - _chem_data.APPROX_ENERGY
-        else:
-            phase_factor = _chem_data.CI
-        phase = -1 * k * phase_factor * _chem_data.DELTAT
-        circ.add_pauliexpbox(
-            PauliExpBox([Pauli.Z], phase),
-            circ.qubits[:1],
-        )
+        for _ in range(k - 1):
+            circ.append(step_qec)
+        if k > 0:
+            circ.append(step)
+        if ancilla_phase:
+            circ.add_pauliexpbox(
+                PauliExpBox([Pauli.Z], get_ctrlu_phase(k, benchmark)),
+                circ.qubits[:1],
+            )
         if pft_rz:
             circ.add_custom_gate(iceberg_w_0_detect, [], [0])
             circ.add_custom_gate(iceberg_w_1_detect, [], [0])
@@ -14,8 +14,10 @@
 
 from typing import (
     Callable,
+    Iterator,
     NamedTuple,
 )
+from functools import lru_cache
 from pytket.circuit import Circuit
 from pytket.backends.backendresult import BackendResult
 from ..encode import EncodeOptions, InterpretOptions
@@ -25,6 +27,7 @@ from ..algorithm import (
 )
 from ._chemistry import (
     get_ctrl_func,
+    get_ctrlu_phase,
     get_state,
 )
 
@@ -40,18 +43,29 @@ class IqpeInput(NamedTuple):
     pft_rz: bool = False
 
 
+def iter_encode_iqpe_circuits(params: IqpeInput) -> Iterator[Circuit]:
+    """Build and encode the circuits one at a time."""
+    # Nothing is kept between circuits, so only the one being handed out is alive.
+    for k, beta in zip(params.k_list, params.beta_list):
+        yield params.encode(
+            _get_iqpe_circuit(k, beta, params.pft_rz, params.qec_level).copy(),
+            params.encode_options,
+        )
+
+
 def build_encode_iqpe_circuits(params: IqpeInput) -> list[Circuit]:
     """Build the cirucits."""
-    logical_circuits = build_iqpe_circuits(
-        k_list=params.k_list,
-        beta_list=params.beta_list,
-        pft_rz=params.pft_rz,
-        qec_level=params.qec_level,
-    )
-    encoded_circuits = [
-        params.encode(c, params.encode_options) for c in logical_circuits
-    ]
-    return encoded_circuits
+    # k_list/beta_list repeat the same pairs, so encode each distinct one only once.
+    encoded: dict[tuple[int, float], Circuit] = {}
+    circuits: list[Circuit] = []
+    for k, beta in zip(params.k_list, params.beta_list):
+        if (k, beta) not in encoded:
+            logical_circuit = _get_iqpe_circuit(
+                k, beta, params.pft_rz, params.qec_level
+            ).copy()
+            encoded[(k, beta)] = params.encode(logical_circuit, params.encode_options)
+        circuits.append(encoded[(k, beta)].copy())
+    return circuits
 
 
 def interpret_process_iqpe_results(
@@ -67,12 +81,8 @@ def interpret_process_iqpe_results(
     return iqpe_result
 
 
-def build_iqpe_circuits(
-    k_list: list[int],
-    beta_list: list[float],
-    pft_rz: bool,
-    qec_level: int,
-) -> list[Circuit]:
+@lru_cache(maxsize=8)
+def _get_iqpe_func(pft_rz: bool, qec_level: int) -> Callable[[int, float], Circuit]:
     state = get_state(
         benchmark=False,
         pft_rz=pft_rz,
@@ -81,14 +91,33 @@ def build_iqpe_circuits(
         benchmark=False,
         pft_rz=pft_rz,
         qec_level=qec_level,
+        # The iceberg QED has to follow the ancilla Rz, so keep it in ctrl-U.
+        ancilla_phase=pft_rz,
     )
-    get_circuit = get_qpe_func(
+    return get_qpe_func(
         state,
         get_ctrlu,
     )
+
+
+# Memoized as k_list/beta_list repeat the same pairs. Shared: copy before handing out.
+@lru_cache(maxsize=256)
+def _get_iqpe_circuit(k: int, beta: float, pft_rz: bool, qec_level: int) -> Circuit:
+    if not pft_rz:
+        # Merge the ancilla phase of ctrl-U into Rz(beta): one Rz instead of two.
+        beta += get_ctrlu_phase(k)
+    return _get_iqpe_func(pft_rz, qec_level)(k, beta)
+
+
+def build_iqpe_circuits(
+    k_list: list[int],
+    beta_list: list[float],
+    pft_rz: bool,
+    qec_level: int,
+) -> list[Circuit]:
     circuits: list[Circuit] = []
     for k, beta in zip(k_list, beta_list):
-        circuits.append(get_circuit(k, beta))
+        circuits.append(_get_iqpe_circuit(k, beta, pft_rz, qec_level).copy())
     return circuits
 
 
@@ -98,6 +98,53 @@ def test_bin_frac_rz_tdg():
     assert list(logical_result.get_counts().keys()) == [(0,)]
 
 
+def test_merged_rz():
+    # consecutive Rz on a qubit are encoded as a single Rz
+    def encode_non_ft(logical: Circuit) -> Circuit:
+        return get_encoded_circuit(
+            logical,
+            rz_mode=RzMode.BIN_FRAC_NON_FT,
+            rz_options=RzOptionsBinFracNonFT(max_bits=5),
+        )
+
+    assert encode_non_ft(
+        Circuit(1, 1).H(0).Rz(0.125, 0).Rz(0.125, 0).H(0).measure_all()
+    ) == encode_non_ft(Circuit(1, 1).H(0).T(0).H(0).measure_all())
+
+    # and dropped if they add up to the identity
+    encoded: Circuit = encode_non_ft(
+        Circuit(1, 1).H(0).Rz(0.75, 0).T(0).Rz(1.0, 0).H(0).measure_all()
+    )
+    assert encoded == encode_non_ft(Circuit(1, 1).H(0).H(0).measure_all())
+    logical_result: BackendResult = get_decoded_result(compile_and_run(encoded, 10))
+    assert list(logical_result.get_counts().keys()) == [(0,)]
+
+
+def test_clifford_rz():
+    # Rz by a multiple of 0.5 is encoded as the transversal Clifford
+    for phase, clifford in [(0.5, Circuit(1).S(0)), (1.0, Circuit(1).Z(0))]:
+        assert get_encoded_circuit(
+            Circuit(1).Rz(phase, 0), rz_mode=RzMode.BIN_FRAC_PART_FT
+        ) == get_encoded_circuit(clifford)
+
+    encoded: Circuit = get_encoded_circuit(
+        Circuit(1, 1).H(0).Rz(1.0, 0).H(0).measure_all(),
+        rz_mode=RzMode.BIN_FRAC_NON_FT,
+        rz_options=RzOptionsBinFracNonFT(max_bits=5),
+    )
+    logical_result: BackendResult = get_decoded_result(compile_and_run(encoded, 10))
+    assert list(logical_result.get_counts().keys()) == [(1,)]
+
+
+def test_no_rz_default_options():
+    # rz_options is only needed once there is an Rz gadget to build
+    logical: Circuit = Circuit(1, 1).H(0).measure_all()
+    for rz_mode in RzMode:
+        assert get_encoded_circuit(logical, rz_mode=rz_mode) == get_encoded_circuit(
+            logical
+        )
+
+
 def test_part_goto_rz_tdg():
     phase: float = 0.25
     logical: Circuit = (
@@ -121,6 +168,19 @@ def test_part_goto_rz_tdg():
     assert list(logical_result.get_counts().keys()) == [(0,)]
 
 
+def test_steane_guard():
+    logical: Circuit = (
+        Circuit(1, 1).X(0).add_custom_gate(steane_z_correct, [], [0]).measure_all()
+    )
+    guard_bit: Bit = Bit("steane_guard_b", 0)
+    # off by default, so the encoded circuit is unchanged
+    assert guard_bit not in get_encoded_circuit(logical).bits
+    encoded: Circuit = get_encoded_circuit(logical, steane_guard=True)
+    assert guard_bit in encoded.bits
+    logical_result: BackendResult = get_decoded_result(compile_and_run(encoded, 10))
+    assert list(logical_result.get_counts().keys()) == [(1,)]
+
+
 def test_discard():
     encoded: Circuit = get_encoded_circuit(
         Circuit(1, 1).add_custom_gate(iceberg_x_0_detect, [], [0]).measure_all()
@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from h2xh2.encode import get_non_ft_prep, get_ft_prep  # type: ignore
+from h2xh2.encode import get_non_ft_prep, get_non_ft_plus_prep, get_ft_prep  # type: ignore
 from pytket import Bit, Circuit, Qubit
 from pytket.backends.backendresult import BackendResult
 from pytket.circuit import CircBox, UnitID
@@ -49,6 +49,21 @@ def test_non_ft_prep_x() -> None:
         assert sum(bitstring) % 2 == 1
 
 
+def test_non_ft_plus_prep() -> None:
+    data_qubits: List[Qubit] = [Qubit("dq", i) for i in range(7)]
+    bits: List[Bit] = [Bit("b", i) for i in range(7)]
+    c: Circuit = get_non_ft_plus_prep(data_qubits)
+    for q, b in zip(data_qubits, bits):
+        c.add_bit(b)
+        c.H(q)
+        c.Measure(q, b)
+
+    # |+> in the X basis should always return even parity codewords
+    for bitstring in compile_and_run(c, 100).get_counts(cbits=bits):
+        assert sum(bitstring) % 2 == 0
+        assert (bitstring[0] + bitstring[1] + bitstring[2] + bitstring[3]) % 2 == 0
+
+
 def test_ft_prep_identity() -> None:
     data_qubits: List[Qubit] = [Qubit("dq", i) for i in range(7)]
     bits: List[Bit] = [Bit("b", i) for i in range(7)]
@@ -178,3 +193,17 @@ def test_ft_cond_prep_off() -> None:
     assert list(result.get_counts(cbits=bits + [goto_bit]).keys()) == [
         (0, 0, 0, 0, 0, 0, 0, 0)
     ]
+
+
+def test_prep_returns_independent_copies() -> None:
+    data_qubits: List[Qubit] = [Qubit("dq", i) for i in range(7)]
+    goto_qubit: Qubit = Qubit("goto", 0)
+    goto_bit: Bit = Bit("goto_bit", 0)
+
+    c0: Circuit = get_non_ft_prep(data_qubits)
+    c0.X(data_qubits[0])
+    assert get_non_ft_prep(data_qubits) != c0
+
+    c1: Circuit = get_ft_prep(data_qubits, goto_qubit, goto_bit)
+    c1.X(goto_qubit)
+    assert get_ft_prep(data_qubits, goto_qubit, goto_bit) != c1
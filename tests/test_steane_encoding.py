@@ -21,11 +21,15 @@ from h2xh2.encode import (  # type: ignore
     get_H,
     get_Measure,
     syndrome_from_readout,
+    readout_correction,
+    readout_correction_batch,
+    syndromes_from_readouts,
 )
 from pytket import Bit, Circuit, Qubit
 from pytket.backends.backendresult import BackendResult
-from typing import List
+from typing import List, Tuple
 from itertools import product
+import numpy as np
 from utils import compile_and_run
 
 
@@ -44,6 +48,29 @@ def test_classical_steane_decoding() -> None:
         assert list(r.get_counts(cbits=syndrome_bits).keys()) == [syndrome[::-1]]
 
 
+def test_classical_steane_decoding_guard() -> None:
+    ancilla_bits: List[Bit] = [Bit("ancilla", i) for i in range(7)]
+    syndrome_bits: List[Bit] = [Bit("syndrome", i) for i in range(3)]
+    guard_bit: Bit = Bit("guard", 0)
+
+    for syndrome in [(0, 0, 0), (1, 0, 1)]:
+        c: Circuit = Circuit(7)
+        if any(syndrome):
+            c.X(steane_lookup_table[syndrome])
+        for q, b in zip(c.qubits, ancilla_bits):
+            c.add_bit(b)
+            c.Measure(q, b)
+        # stale syndrome from a previous cycle, which must not survive the guard
+        for b in syndrome_bits:
+            c.add_bit(b)
+        c.add_c_setbits([True] * 3, syndrome_bits)
+        c.append(classical_steane_decoding(ancilla_bits, syndrome_bits, guard_bit))
+        r: BackendResult = compile_and_run(c, 20)
+        assert list(r.get_counts(cbits=syndrome_bits + [guard_bit]).keys()) == [
+            syndrome[::-1] + (int(any(syndrome)),)
+        ]
+
+
 def test_steane_z_correction() -> None:
     data_qubits: List[Qubit] = [Qubit("data_q", i) for i in range(7)]
     data_bits: List[Bit] = [Bit("data_b", i) for i in range(7)]
@@ -172,3 +199,26 @@ def test_steane_xz_correction() -> None:
             # check artifical error has been corrected
             assert syndrome_from_readout(k[:7]) == (0, 0, 0)
         assert list(r.get_counts(cbits=[goto_bit]).keys()) == [(0,)]
+
+
+def test_readout_correction() -> None:
+    codeword: Tuple[int, ...] = (1, 1, 1, 1, 0, 0, 0)
+    assert syndrome_from_readout(codeword) == (0, 0, 0)
+    assert readout_correction(codeword) == codeword
+    for error_index in range(7):
+        readout: List[int] = list(codeword)
+        readout[error_index] ^= 1
+        assert syndrome_from_readout(tuple(readout)) != (0, 0, 0)
+        assert readout_correction(tuple(readout)) == codeword
+
+
+def test_readout_correction_batch() -> None:
+    readouts: List[Tuple[int, ...]] = list(product((0, 1), repeat=7))
+    syndromes = syndromes_from_readouts(np.array(readouts))
+    assert [tuple(s) for s in syndromes.tolist()] == [
+        syndrome_from_readout(r) for r in readouts
+    ]
+    corrected = readout_correction_batch(np.array(readouts))
+    assert [tuple(r) for r in corrected.tolist()] == [
+        readout_correction(r) for r in readouts
+    ]